@@ -1,176 +1,43 @@
-import math
-import pandas as pd
-import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import tkinter as tk
+import numpy as np
 import os
-import time
 import threading
+from queue import Queue, Empty
 import unity_communication 
-
-def latlon_to_xy(lat, lon, ref_lat=24.64):
-    meters_per_deg_lat = 111000  # 1kat ≈ 111km
-    meters_per_deg_lon = 111000 * math.cos(math.radians(ref_lat))  
-    x = lon * meters_per_deg_lon
-    y = lat * meters_per_deg_lat
-    return x, y
-
-def euclidean_distance(lat1, lon1, lat2, lon2, ref_lat=24.64):
-    x1, y1 = latlon_to_xy(lat1, lon1, ref_lat)
-    x2, y2 = latlon_to_xy(lat2, lon2, ref_lat)
-    distance = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-    return distance
-
-# status 
-def classify_planting_status(seedlings, standard_spacing):
-    S = standard_spacing 
-    S_min = 0.4 * S     
-    S_max = 1.6 * S     
-    
-    statuses = {}        
-    counts = {           
-        "Normal": 0,
-        "Root Exposed": 0,
-        "Buried": 0,
-        "Overlap": 0,    
-        "Missing": 0
-    }
-    missed_points = []   
-    overlap_group = []   
-    
-    unique_seedlings = []
-    seen_coords = set()
-    for s in seedlings:
-        coord = (s["lat"], s["lon"])
-        if coord not in seen_coords:
-            seen_coords.add(coord)
-            unique_seedlings.append(s)
-    
-    # deal with first seedling
-    if unique_seedlings:
-        frame_id = f"seedling_{unique_seedlings[0]['frame']}"
-        if unique_seedlings[0]["label"] == "Seedling":
-            statuses[frame_id] = "Normal"
-            counts["Normal"] += 1
-        elif unique_seedlings[0]["label"] == "Root":
-            statuses[frame_id] = "Root Exposed"
-            counts["Root Exposed"] += 1
-        elif unique_seedlings[0]["label"] == "Buried Seedling":
-            statuses[frame_id] = "Buried"
-            counts["Buried"] += 1
-    
-    # check in list
-    for i in range(1, len(unique_seedlings)):
-        seedling_id = f"seedling_{unique_seedlings[i]['frame']}"
-        current = unique_seedlings[i]
-        previous = unique_seedlings[i-1]
-        distance = euclidean_distance(current["lat"], current["lon"], previous["lat"], previous["lon"])
-      
-        if distance < S_min:
-            if not overlap_group or overlap_group[-1][-1] == previous["frame"]:
-                if not overlap_group:
-                    overlap_group.append([previous["frame"], current["frame"]])
-                else:
-                    overlap_group[-1].append(current["frame"])
-            else:
-                overlap_group.append([previous["frame"], current["frame"]])
-            statuses[f"seedling_{previous['frame']}"] = "Overlap"
-            statuses[seedling_id] = "Overlap"
-            if statuses[f"seedling_{previous['frame']}"] != "Overlap": 
-                if unique_seedlings[i-1]["label"] == "Seedling":
-                    counts["Normal"] -= 1
-                elif unique_seedlings[i-1]["label"] == "Root":
-                    counts["Root Exposed"] -= 1
-                elif unique_seedlings[i-1]["label"] == "Buried Seedling":
-                    counts["Buried"] -= 1
-        else:
-            if overlap_group:
-                counts["Overlap"] += 1
-                overlap_group = []
-            
-            if distance > S_max:
-                mid_lat = (current["lat"] + previous["lat"]) / 2
-                mid_lon = (current["lon"] + previous["lon"]) / 2
-                missed_points.append({
-                    "lat": mid_lat,
-                    "lon": mid_lon,
-                    "frame_prev": previous["frame"],
-                    "frame_curr": current["frame"]
-                })
-                counts["Missing"] += 1
-                if current["label"] == "Seedling":
-                    statuses[seedling_id] = "Normal"
-                    counts["Normal"] += 1
-                elif current["label"] == "Root":
-                    statuses[seedling_id] = "Root Exposed"
-                    counts["Root Exposed"] += 1
-                elif current["label"] == "Buried Seedling":
-                    statuses[seedling_id] = "Buried"
-                    counts["Buried"] += 1
-            else:
-                if current["label"] == "Seedling":
-                    statuses[seedling_id] = "Normal"
-                    counts["Normal"] += 1
-                elif current["label"] == "Root":
-                    statuses[seedling_id] = "Root Exposed"
-                    counts["Root Exposed"] += 1
-                elif current["label"] == "Buried Seedling":
-                    statuses[seedling_id] = "Buried"
-                    counts["Buried"] += 1
-    
-    if overlap_group:
-        counts["Overlap"] += 1
-      
-    if len(unique_seedlings) > 1 and statuses.get(f"seedling_{unique_seedlings[0]['frame']}") != "Overlap":
-        distance = euclidean_distance(unique_seedlings[0]["lat"], unique_seedlings[0]["lon"], 
-                                     unique_seedlings[1]["lat"], unique_seedlings[1]["lon"])
-        if distance < S_min:
-            statuses[f"seedling_{unique_seedlings[0]['frame']}"] = "Overlap"
-            if overlap_group and overlap_group[0][0] == unique_seedlings[1]["frame"]:
-                overlap_group[0].insert(0, unique_seedlings[0]["frame"])
-            else:
-                counts["Overlap"] += 1
-                overlap_group.insert(0, [unique_seedlings[0]["frame"], unique_seedlings[1]["frame"]])
-            if unique_seedlings[0]["label"] == "Seedling":
-                counts["Normal"] -= 1
-            elif unique_seedlings[0]["label"] == "Root":
-                counts["Root Exposed"] -= 1
-            elif unique_seedlings[0]["label"] == "Buried Seedling":
-                counts["Buried"] -= 1
-    
-    return statuses, counts, missed_points
-
-def process_csv(file_path):
-    df = pd.read_csv(file_path)
-    seedlings = []
-    for _, row in df.iterrows():
-        seedlings.append({
-            "label": row["Label"],  # 支持Seedling, Root, Buried Seedling
-            "frame": row["Frame_Number"],
-            "lat": float(row["Latitude"]),
-            "lon": float(row["Longitude"])
-        })
-    return seedlings
+from event_bus import BusClient, DEFAULT_ADDRESS
+from record_store import RecordStore
+from planting_status import process_csv, process_store, RowClassifier
+from seedling_table import STATUS_NAMES, OVERLAP, NO_STATUS
+from refresh_scheduler import RefreshScheduler
+import field_export
 
 class PlantingStatusApp:
-    def __init__(self, file_path="crossing_records.csv", standard_spacing=0.5, unity_comm=None):
+    def __init__(self, file_path="crossing_records.db", standard_spacing=0.5, unity_comm=None, refresh_rate=5.0,
+                 bus=None):
         self.file_path = file_path
+        self.store = None
+        self.record_keys = set()
+        self.sessions = {}  # planting row -> newest count.py session shown
+        # classified per planting row; seedlings of all rows and their statuses share one table
+        self.classifier = RowClassifier(standard_spacing)
+        self.table = self.classifier.table
         self.standard_spacing = standard_spacing
         self.last_modification_time = 0
-        self.seedlings = []
-        self.statuses = {}
         self.counts = {}
         self.missed_points = []
         self.is_running = True
         self.lock = threading.Lock()
+        self.export_thread = None
         
         # Unity Communication
         self.unity_comm = unity_comm
         
         self.xlim = None
         self.ylim = None
+        self.limits_changed = False
         
         self.root = tk.Tk()
         self.root.geometry("1200x800")
@@ -178,9 +45,19 @@ class PlantingStatusApp:
         
         self.create_widgets()
         
-        self.monitor_thread = threading.Thread(target=self.monitor_file)
-        self.monitor_thread.daemon = True
-        self.monitor_thread.start()
+        # at most refresh_rate redraws per second, however many updates arrive
+        self.refresh = RefreshScheduler(self.root, self.update_display, self.merge_snapshots, refresh_rate)
+        self.refresh.start()
+        
+        # records are pushed by the enricher over the event bus; subscribe before catching up
+        self.events = Queue()
+        self.last_seq = 0
+        self.bus = bus
+        if bus is not None:
+            bus.subscribe("record", self.on_record)
+        
+        self.monitor_thread = None
+        self.start()
     
     def create_widgets(self):
         self.fig = Figure(figsize=(12, 8), dpi=100)
@@ -191,147 +68,218 @@ class PlantingStatusApp:
 
         self.stats_ax.axis('off')
 
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self.root)
-        self.canvas.draw()
-        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        
-        self.update_stats_display()
-    
-    def update_stats_display(self):
-        self.stats_ax.clear()
-        self.stats_ax.axis('off')
-        
-        self.stats_ax.text(0.5, 0.95, "Status Statistics", 
-                         fontsize=14, fontweight='bold', 
-                         ha='center', va='top')
-        
-        statuses = ["Normal", "Root Exposed", "Buried", "Overlap", "Missing"]
-        colors = {
+        self.colors = {
             "Normal": "green",
             "Root Exposed": "red",
             "Buried": "blue",
             "Overlap": "orange",
             "Missing": "purple"
         }
-        
-        y_pos = 0.85
-        for status in statuses:
-            count = self.counts.get(status, 0)
-            self.stats_ax.text(0.5, y_pos, f"{status}: {count}", 
-                             fontsize=12, ha='center', va='top',
-                             bbox=dict(facecolor='white', edgecolor=colors.get(status, 'black'), 
-                                       alpha=0.8, boxstyle='round,pad=0.5'))
-            y_pos -= 0.1
-    
-    def update_scatter_plot(self):
-        self.scatter_ax.clear()
-        
-        colors = {
-            "Normal": "green",
-            "Root Exposed": "red",
-            "Buried": "blue",
-            "Overlap": "orange"
-        }
-        
-        added_labels = set()
-        
-        overlap_centers = {}  # {group_first_frame: (lat_avg, lon_avg)}
-        overlap_group = []
-        
-        for i in range(len(self.seedlings)):
-            current = self.seedlings[i]
-            frame_id = f"seedling_{current['frame']}"
-            status = self.statuses.get(frame_id, "Normal")
-            
-            if status == "Overlap":
-                if not overlap_group or overlap_group[-1]["frame"] == self.seedlings[i-1]["frame"]:
-                    overlap_group.append(current)
-                else:
-                    if overlap_group:
-                        avg_lat = sum(s["lat"] for s in overlap_group) / len(overlap_group)
-                        avg_lon = sum(s["lon"] for s in overlap_group) / len(overlap_group)
-                        overlap_centers[overlap_group[0]["frame"]] = (avg_lat, avg_lon)
-                        overlap_group = [current]
-            else:
-                if overlap_group:
-                    avg_lat = sum(s["lat"] for s in overlap_group) / len(overlap_group)
-                    avg_lon = sum(s["lon"] for s in overlap_group) / len(overlap_group)
-                    overlap_centers[overlap_group[0]["frame"]] = (avg_lat, avg_lon)
-                    overlap_group = []
-
-        if overlap_group:
-            avg_lat = sum(s["lat"] for s in overlap_group) / len(overlap_group)
-            avg_lon = sum(s["lon"] for s in overlap_group) / len(overlap_group)
-            overlap_centers[overlap_group[0]["frame"]] = (avg_lat, avg_lon)
-        
-        for seedling in self.seedlings:
-            frame_id = f"seedling_{seedling['frame']}"
-            status = self.statuses.get(frame_id, "Normal")
-            
-            if status == "Overlap":
-                if seedling["frame"] not in overlap_centers:
-                    continue
-                lat, lon = overlap_centers[seedling["frame"]]
-            else:
-                lat, lon = seedling["lat"], seedling["lon"]
-            
-            color = colors.get(status, "gray")
 
-            label = status if status not in added_labels else ""
-            if label:
-                added_labels.add(status)
-                
-            self.scatter_ax.scatter(lon, lat, 
-                                   c=color, marker="o", s=100, 
-                                   label=label)
+        # Persistent collections per status; updates only move their offsets.
+        # Seedlings whose status can no longer change are baked into the cached
+        # background, so a redraw only paints the new ones and the live tail; the
+        # frozen collections hold them too, for full draws on a resize or expose.
+        self.frozen_artists = self.create_status_artists(animated=False)
+        self.bake_artists = self.create_status_artists(animated=True)
+        self.status_artists = self.create_status_artists(animated=True)
+        self.baked_rows = {}  # planting row -> seedlings already in the background
+        self.baked_missed = 0
+        self.pending_bake = None
+        self.frozen_chunks = {status: [] for status in self.frozen_artists}
+        self.present_statuses = set()
+        self.legend_statuses = None
 
-        if self.missed_points:
-            missed_lats = [point["lat"] for point in self.missed_points]
-            missed_lons = [point["lon"] for point in self.missed_points]
-            self.scatter_ax.scatter(missed_lons, missed_lats, 
-                                   facecolors='none', 
-                                   edgecolors='purple', 
-                                   linewidth=2, 
-                                   s=150, 
-                                   marker="o", 
-                                   label="Missing" if "Missing" not in added_labels else "")
-
-        if self.xlim and self.ylim:
-            self.scatter_ax.set_xlim(self.xlim)
-            self.scatter_ax.set_ylim(self.ylim)
-
-        self.scatter_ax.legend(loc='best')
         self.scatter_ax.set_xlabel("Longitude")
         self.scatter_ax.set_ylabel("Latitude")
         self.scatter_ax.set_title("Planting Status Distribution")
-        
+
+        self.stats_ax.text(0.5, 0.95, "Status Statistics", 
+                         fontsize=14, fontweight='bold', 
+                         ha='center', va='top')
+        self.stats_texts = {}
+        y_pos = 0.85
+        for status in ["Normal", "Root Exposed", "Buried", "Overlap", "Missing"]:
+            self.stats_texts[status] = self.stats_ax.text(
+                0.5, y_pos, f"{status}: 0", fontsize=12, ha='center', va='top', animated=True,
+                bbox=dict(facecolor='white', edgecolor=self.colors[status],
+                          alpha=0.8, boxstyle='round,pad=0.5'))
+            y_pos -= 0.1
+
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.root)
+        self.background = None
+        self.canvas.mpl_connect('draw_event', self.on_draw)
         self.fig.tight_layout()
+        self.canvas.draw()
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        
+        self.update_stats_display(self.counts)
     
-    def update_display(self):
-        try:
-            with self.lock:
-                self.update_scatter_plot()
-                self.update_stats_display()
-            
-            # Refresh canva
-            self.canvas.draw_idle()  
-            
-        except Exception as e:
-            print(f"ERROR: {e}")
+    def create_status_artists(self, animated):
+        artists = {}
+        for status in ["Normal", "Root Exposed", "Buried", "Overlap"]:
+            artists[status] = self.scatter_ax.scatter(
+                [], [], c=self.colors[status], marker="o", s=100,
+                label=status if not animated else None, animated=animated)
+        artists["Missing"] = self.scatter_ax.scatter(
+            [], [], facecolors='none', edgecolors='purple', linewidth=2, s=150, marker="o",
+            label="Missing" if not animated else None, animated=animated)
+        return artists
+
+    def update_stats_display(self, counts):
+        for status, text in self.stats_texts.items():
+            text.set_text(f"{status}: {counts.get(status, 0)}")
     
-    def update_limits(self):
-        if not self.seedlings:
+    def status_offsets(self, index):
+        # offsets per status for the table rows in index (RowClassifier.table_index order,
+        # cut at stable_rows boundaries so no overlap run is split)
+        status = self.table.status[index]
+        points = np.column_stack((self.table.lon[index], self.table.lat[index]))
+        planting_rows = self.table.row[index]
+        offsets = {}
+        for code, name in enumerate(STATUS_NAMES[:OVERLAP]):
+            mask = status == code
+            if name == "Normal":
+                # seedlings without a status are drawn as Normal
+                mask |= status == NO_STATUS
+            offsets[name] = points[mask]
+
+        # overlap runs are drawn once, at the centroid of each run; runs never span planting rows
+        overlap = status == OVERLAP
+        same_row = planting_rows[1:] == planting_rows[:-1]
+        before = np.concatenate(([False], overlap[:-1] & same_row))
+        after = np.concatenate((overlap[1:] & same_row, [False]))
+        starts = np.flatnonzero(overlap & ~before)
+        ends = np.flatnonzero(overlap & ~after) + 1
+        origin = points[0] if len(points) else np.zeros(2)
+        sums = np.concatenate((np.zeros((1, 2)), np.cumsum(points - origin, axis=0)))
+        offsets["Overlap"] = (origin + (sums[ends] - sums[starts]) / (ends - starts)[:, None]).reshape(-1, 2)
+        return offsets
+
+    def missed_offsets(self, start):
+        return np.array([(p["lon"], p["lat"]) for p in self.missed_points[start:]]).reshape(-1, 2)
+
+    def take_snapshot(self, reset):
+        # called with self.lock held; copies only rows that became stable since the
+        # last snapshot plus the live tail, so the UI can draw without the lock
+        boundary = self.classifier.stable_rows()
+        if reset:
+            self.baked_rows = {}
+            self.baked_missed = 0
+        bake = self.status_offsets(self.classifier.table_index(self.baked_rows, boundary))
+        bake["Missing"] = self.missed_offsets(self.baked_missed)
+        live = self.status_offsets(self.classifier.table_index(boundary))
+        live["Missing"] = np.empty((0, 2))
+        self.baked_rows = boundary
+        self.baked_missed = len(self.missed_points)
+        return {
+            "reset": reset,
+            "limits_changed": self.limits_changed,
+            "xlim": self.xlim,
+            "ylim": self.ylim,
+            "counts": dict(self.counts),
+            "bake": bake,
+            "live": live
+        }
+
+    def merge_snapshots(self, old, new):
+        # a refresh that was never drawn still owes its stable rows to the background
+        if new["reset"]:
+            new["limits_changed"] = True
+            return new
+        new["reset"] = old["reset"]
+        new["limits_changed"] = old["limits_changed"] or new["limits_changed"]
+        new["bake"] = {status: np.concatenate((old["bake"][status], points))
+                       for status, points in new["bake"].items()}
+        return new
+
+    def update_scatter_plot(self, snapshot):
+        if snapshot["reset"]:
+            self.frozen_chunks = {status: [] for status in self.frozen_artists}
+            self.present_statuses = set()
+        for status, points in snapshot["bake"].items():
+            if len(points):
+                self.frozen_chunks[status].append(points)
+                self.present_statuses.add(status)
+        for status, artist in self.status_artists.items():
+            artist.set_offsets(snapshot["live"][status])
+            if len(snapshot["live"][status]):
+                self.present_statuses.add(status)
+        self.pending_bake = snapshot["bake"]
+
+    def freeze_chunks(self):
+        # every stable point goes into the non-animated collections, which full draws paint
+        for status, artist in self.frozen_artists.items():
+            chunks = self.frozen_chunks[status]
+            if len(chunks) > 1:
+                chunks[:] = [np.concatenate(chunks)]
+            artist.set_offsets(chunks[0] if chunks else np.empty((0, 2)))
+        self.pending_bake = None
+
+    def update_layout(self, snapshot):
+        if snapshot["xlim"] and snapshot["ylim"]:
+            self.scatter_ax.set_xlim(snapshot["xlim"])
+            self.scatter_ax.set_ylim(snapshot["ylim"])
+        self.legend_statuses = set(self.present_statuses)
+        handles = [artist for status, artist in self.frozen_artists.items() if status in self.legend_statuses]
+        if handles:
+            self.scatter_ax.legend(handles=handles, loc='best')
+        elif self.scatter_ax.get_legend():
+            self.scatter_ax.get_legend().remove()
+        self.fig.tight_layout()
+
+    def on_draw(self, event):
+        # a full draw (layout change, resize) refreshes the background under the animated artists
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_animated()
+
+    def draw_animated(self):
+        for artist in self.status_artists.values():
+            self.scatter_ax.draw_artist(artist)
+        for text in self.stats_texts.values():
+            self.stats_ax.draw_artist(text)
+
+    def blit(self):
+        if self.background is None:
+            self.canvas.draw()
             return
+        self.canvas.restore_region(self.background)
+        if self.pending_bake:
+            # paint newly stable seedlings once and keep them in the background
+            for status, artist in self.bake_artists.items():
+                artist.set_offsets(self.pending_bake[status])
+                self.scatter_ax.draw_artist(artist)
+            self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+            self.freeze_chunks()
+        self.draw_animated()
+        self.canvas.blit(self.fig.bbox)
+
+    def update_display(self, snapshot):
+        # runs on the Tk thread from the refresh scheduler; only touches the snapshot
+        self.update_scatter_plot(snapshot)
+        self.update_stats_display(snapshot["counts"])
+
+        # limits or legend changed: redraw everything, otherwise only what is new
+        if (snapshot["limits_changed"] or snapshot["reset"] or self.background is None
+                or self.present_statuses != self.legend_statuses):
+            self.freeze_chunks()
+            self.update_layout(snapshot)
+            self.canvas.draw()
+        else:
+            self.blit()
+    
+    def update_limits(self):
+        if not len(self.table):
+            return False
             
-        lons = [s["lon"] for s in self.seedlings]
-        lats = [s["lat"] for s in self.seedlings]
+        xmin, xmax = float(self.table.lon.min()), float(self.table.lon.max())
+        ymin, ymax = float(self.table.lat.min()), float(self.table.lat.max())
         
         if self.missed_points:
-            lons.extend([p["lon"] for p in self.missed_points])
-            lats.extend([p["lat"] for p in self.missed_points])
-            
-        xmin, xmax = min(lons), max(lons)
-        ymin, ymax = min(lats), max(lats)
+            xmin = min(xmin, min(p["lon"] for p in self.missed_points))
+            xmax = max(xmax, max(p["lon"] for p in self.missed_points))
+            ymin = min(ymin, min(p["lat"] for p in self.missed_points))
+            ymax = max(ymax, max(p["lat"] for p in self.missed_points))
         
         if xmax - xmin < 1e-5:
             xmin -= 0.0001
@@ -348,12 +296,13 @@ class PlantingStatusApp:
         if self.xlim is None:
             self.xlim = new_xlim
             self.ylim = new_ylim
-            return
+            return True
 
         current_width = self.xlim[1] - self.xlim[0]
         current_height = self.ylim[1] - self.ylim[0]
-        margin_x = current_width * 0.1
-        margin_y = current_height * 0.1
+        # the padding is 1/12 of the new width, so a 10% margin would relayout on every update
+        margin_x = current_width * 0.05
+        margin_y = current_height * 0.05
         
         need_update = False
         if xmin < self.xlim[0] + margin_x or xmax > self.xlim[1] - margin_x:
@@ -365,83 +314,146 @@ class PlantingStatusApp:
             
         return need_update
     
-    def monitor_file(self):
-        last_content = ""
+    def open_store(self):
+        if self.store is None and self.file_path.endswith(".db") and os.path.exists(self.file_path):
+            self.store = RecordStore(self.file_path)
+        return self.store
+
+    def read_updates(self, last_version):
+        # returns (version, seedlings, replace); replace means seedlings is the full list
+        if not os.path.exists(self.file_path):
+            return last_version, None, False
+        if self.file_path.endswith(".db"):
+            self.open_store()
+            rows, version = self.store.fetch_since(last_version or 0)
+            if not rows:
+                return last_version, None, False
+            seedlings = []
+            replace = False
+            for label, frame, _, lat, lon, _, _, row, session in rows:
+                change = self.record_change(label, frame, row, session)
+                if change is None:
+                    continue
+                replace |= change
+                seedlings.append({"label": label, "frame": frame, "lat": float(lat), "lon": float(lon), "row": row})
+            if replace:
+                return version, process_store(self.store), True
+            return version, seedlings or None, False
+        with open(self.file_path, 'r') as f:
+            version = f.read()
+        if version == last_version:
+            return last_version, None, False
+        return version, process_csv(self.file_path), True
+
+    def record_change(self, label, frame, row, session):
+        # None for a record of an older session than the row shows; otherwise True when it changes
+        # history (an update to a known record, or a new count.py run on the row), so everything
+        # is classified from scratch
+        current = self.sessions.get(row)
+        if current is not None and session < current:
+            return None
+        key = (label, frame, row, session)
+        replace = key in self.record_keys or (current is not None and session > current)
+        self.record_keys.add(key)
+        self.sessions[row] = session
+        return replace
+
+    def on_record(self, record):
+        # bus callback: (seq, label, frame, timestamp, lat, lon, speed, course, row, session) from the enricher
+        self.events.put(record)
+
+    def read_events(self):
+        # whatever arrived on the bus as (seedlings, replace), or None when nothing is new
+        try:
+            records = [self.events.get(timeout=0.5)]
+        except Empty:
+            return None
+        while True:
+            try:
+                records.append(self.events.get_nowait())
+            except Empty:
+                break
+        records = [record for record in records if record[0] > self.last_seq]
+        if not records:
+            return None
+        records.sort()
+        seqs = [record[0] for record in records]
+        if seqs != list(range(self.last_seq + 1, seqs[-1] + 1)) and self.open_store() is not None:
+            # records went by before we subscribed or while the bus was down: read the gap
+            self.last_seq, seedlings, replace = self.read_updates(self.last_seq)
+            return (seedlings, replace) if seedlings is not None else None
+
+        seedlings = []
+        replace = False
+        for seq, label, frame, _, lat, lon, _, _, row, session in records:
+            change = self.record_change(label, int(frame), int(row), float(session))
+            if change is None:
+                continue
+            replace |= change
+            seedlings.append({"label": label, "frame": int(frame), "lat": float(lat), "lon": float(lon),
+                              "row": int(row)})
+        self.last_seq = records[-1][0]
+        if replace and self.open_store() is not None:
+            seedlings = process_store(self.store)
+        return (seedlings, replace) if seedlings or replace else None
+
+    def apply_seedlings(self, seedlings, replace):
+        with self.lock:
+            if replace:
+                self.classifier.reset()
+                self.xlim = self.ylim = None
+            changes = self.classifier.add_many(seedlings)
+            if self.unity_comm:
+                # the twin gets only the rows whose status changed
+                if replace:
+                    self.unity_comm.reset_twin()
+                self.unity_comm.update_twin(self.table, changes["rows"], changes["missed_points"])
+            self.counts = self.classifier.counts
+            self.missed_points = self.classifier.missed_points
+            
+            self.limits_changed = self.update_limits()
+            snapshot = self.take_snapshot(replace)
+        
+        if changes["counts"]:
+            print("\n new data:")
+            for key, value in self.counts.items():
+                print(f"{key}: {value}")
+            if len(self.classifier.rows) > 1:
+                for row, classifier in sorted(self.classifier.rows.items()):
+                    print(f"row {row}: " + ", ".join(f"{key} {value}" for key, value in classifier.counts.items()))
+        
+        self.refresh.submit(snapshot)
+
+    def monitor_events(self):
+        # catch up with what is already stored, then follow the bus; nothing polls the file
+        try:
+            version, seedlings, replace = self.read_updates(None)
+            if isinstance(version, int):
+                self.last_seq = version
+            if seedlings is not None:
+                self.apply_seedlings(seedlings, replace)
+        except Exception as e:
+            print(f"ERROR: {e}")
         while self.is_running:
             try:
-                if os.path.exists(self.file_path):
-                    with open(self.file_path, 'r') as f:
-                        current_content = f.read()
-
-                    if current_content != last_content:
-                        last_content = current_content  
-                  
-                        with self.lock:
-                            self.seedlings = process_csv(self.file_path)
-                            self.statuses, self.counts, self.missed_points = classify_planting_status(
-                                self.seedlings, self.standard_spacing)
-                            
-                            need_update = self.update_limits()
-                        
-                        print("\n new data:")
-                        for key, value in self.counts.items():
-                            print(f"{key}: {value}")
-                        
-                        self.root.after(0, self.update_display)
+                update = self.read_events()
+                if update is not None:
+                    self.apply_seedlings(*update)
             except Exception as e:
                 print(f"ERROR: {e}")
-            
-            time.sleep(0.1)  
     
     def on_closing(self):
         self.is_running = False
+        self.refresh.stop()
+        print(self.refresh.report())
         
         try:
-            plt.figure(figsize=(12, 8))
-            colors = {
-                "Normal": "green",
-                "Root Exposed": "red",
-                "Buried": "blue",
-                "Overlap": "orange"
-            }
-            
-            added_labels = set()
-            
-            for seedling in self.seedlings:
-                frame_id = f"seedling_{seedling['frame']}"
-                status = self.statuses.get(frame_id, "Normal")
-                color = colors.get(status, "gray")
-                
-                label = status if status not in added_labels else ""
-                if label:
-                    added_labels.add(status)
-                    
-                plt.scatter(seedling["lon"], seedling["lat"], 
-                          c=color, marker="o", s=100, 
-                          label=label)
-            
-            if self.missed_points:
-                missed_lats = [point["lat"] for point in self.missed_points]
-                missed_lons = [point["lon"] for point in self.missed_points]
-                plt.scatter(missed_lons, missed_lats, 
-                          facecolors='none', 
-                          edgecolors='purple', 
-                          linewidth=2, 
-                          s=150, 
-                          marker="o", 
-                          label="Missing" if "Missing" not in added_labels else "")
-            
-            plt.legend(loc='best')
-            plt.xlabel("Longitude")
-            plt.ylabel("Latitude")
-            plt.title("Planting Status Distribution")
-            
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            filename = f"planting_status_{timestamp}.png"
-            
-            plt.savefig(filename, dpi=300, bbox_inches='tight')
-            print(f"sava as: {filename}")
-            plt.close()
+            # the field is written by a background thread; the window closes right away
+            with self.lock:
+                table = self.table.copy()
+                missed_points = list(self.missed_points)
+            self.export_thread = field_export.start_export(
+                table, missed_points, progress=lambda done, total, path: print(f"export [{done}/{total}]: {path}"))
         except Exception as e:
             print(f"ERROR: {e}")
         
@@ -449,7 +461,9 @@ class PlantingStatusApp:
     
     def start(self):
         self.is_running = True
-        self.monitor_thread = threading.Thread(target=self.monitor_file)
+        if self.monitor_thread is not None and self.monitor_thread.is_alive():
+            return
+        self.monitor_thread = threading.Thread(target=self.monitor_events)
         self.monitor_thread.daemon = True
         self.monitor_thread.start()
     
@@ -457,8 +471,9 @@ class PlantingStatusApp:
         self.is_running = False
         self.root.quit()
 
-def start_state_monitoring(file_path="crossing_records.csv", standard_spacing=0.5, unity_comm=None):
-    app = PlantingStatusApp(file_path, standard_spacing, unity_comm)
+def start_state_monitoring(file_path="crossing_records.db", standard_spacing=0.5, unity_comm=None, refresh_rate=5.0,
+                           bus=None):
+    app = PlantingStatusApp(file_path, standard_spacing, unity_comm, refresh_rate, bus)
     app.start()
     return app
 
@@ -466,5 +481,7 @@ if __name__ == "__main__":
     unity_comm = unity_communication.UnityCommManager(host='127.0.0.1', port=8888)
     unity_comm.start_server()
     
-    app = start_state_monitoring(unity_comm=unity_comm)
+    # standalone: follow the records main.py publishes on its event bus; needs that run's
+    # CROSSING_BUS_AUTHKEY in the environment
+    app = start_state_monitoring(unity_comm=unity_comm, bus=BusClient(DEFAULT_ADDRESS))
     app.root.mainloop()  #  Run GUI
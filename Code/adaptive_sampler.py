@@ -0,0 +1,94 @@
+import numpy as np
+from gnss_index import GNSSIndex
+
+
+class GNSSSpeedSource:
+    def __init__(self, gnss_path="GNSS.csv", timestamps_path="frames_timestamps.csv"):
+        self.index = GNSSIndex.from_csv(timestamps_path, gnss_path)
+
+    def speed_for_frame(self, frame_number):
+        index = self.index
+        if len(index.frames) == 0 or len(index.gps_times) == 0:
+            return None
+        # sampled frames may fall between logged ones; use the latest logged frame
+        i = max(0, np.searchsorted(index.frames, frame_number, side="right") - 1)
+        return float(index.speed[index.nearest_fix([index.frame_times[i]])[0]])
+
+
+class AdaptiveSampler:
+    def __init__(self, fps, travel_px, target_observations=4, default_interval=1,
+                 min_interval=1, max_interval=None, speed_source=None, pixels_per_meter=None,
+                 stopped_speed=0.05, smoothing=0.3, track_timeout=None):
+        self.fps = fps
+        self.travel_px = travel_px
+        self.target_observations = target_observations
+        self.default_interval = default_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval or max(min_interval, int(fps // 2))
+        self.speed_source = speed_source
+        self.pixels_per_meter = pixels_per_meter
+        self.stopped_speed = stopped_speed
+        self.smoothing = smoothing
+        self.track_timeout = track_timeout or 4 * self.max_interval
+
+        self.live_speed = None
+        self.px_per_frame = None
+        self.last_seen = {}  # track_id -> (frame_number, center_x)
+        self.interval_total = 0
+        self.interval_count = 0
+
+    def update_speed(self, speed):
+        self.live_speed = speed
+
+    def current_speed(self, frame_number):
+        if self.live_speed is not None:
+            return self.live_speed
+        if self.speed_source is not None:
+            return self.speed_source.speed_for_frame(frame_number)
+        return None
+
+    def _smooth(self, old, new):
+        return new if old is None else old + self.smoothing * (new - old)
+
+    def observe(self, frame_number, track_ids, centers_x):
+        velocities = []
+        for track_id, center_x in zip(track_ids, centers_x):
+            previous = self.last_seen.get(track_id)
+            if previous is not None and frame_number > previous[0]:
+                velocities.append(abs(center_x - previous[1]) / (frame_number - previous[0]))
+            self.last_seen[track_id] = (frame_number, center_x)
+
+        if velocities:
+            self.px_per_frame = self._smooth(self.px_per_frame, float(np.median(velocities)))
+            speed = self.current_speed(frame_number)
+            if speed is not None and speed > self.stopped_speed:
+                self.pixels_per_meter = self._smooth(self.pixels_per_meter,
+                                                     self.px_per_frame * self.fps / speed)
+
+        oldest = frame_number - self.track_timeout
+        for track_id in [t for t, (f, _) in self.last_seen.items() if f < oldest]:
+            del self.last_seen[track_id]
+
+    def next_interval(self, frame_number):
+        speed = self.current_speed(frame_number)
+        if speed is not None and speed <= self.stopped_speed:
+            interval = self.max_interval
+        else:
+            if speed is not None and self.pixels_per_meter:
+                px_per_frame = speed * self.pixels_per_meter / self.fps
+            else:
+                px_per_frame = self.px_per_frame
+            if px_per_frame is None:
+                interval = self.default_interval
+            elif px_per_frame <= 0:
+                interval = self.max_interval
+            else:
+                # frames between samples so each seedling is seen target_observations times before the line
+                interval = int(self.travel_px / (self.target_observations * px_per_frame))
+        interval = min(self.max_interval, max(self.min_interval, interval))
+        self.interval_total += interval
+        self.interval_count += 1
+        return interval
+
+    def mean_interval(self):
+        return self.interval_total / self.interval_count if self.interval_count else 0.0
@@ -0,0 +1,72 @@
+import time
+import argparse
+import cv2
+import numpy as np
+from detector import load_detector, backend_for_path
+
+
+def read_frames(video_path, count, scale_factor=0.5):
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.resize(frame, None, fx=scale_factor, fy=scale_factor))
+    cap.release()
+    if not frames:
+        raise RuntimeError(f"could not read frames from {video_path}")
+    return frames
+
+
+def measure_latency(detector, frames, warmup=10):
+    for frame in frames[:warmup]:
+        detector.predict(frame, conf=0.4, iou=0.5, verbose=False)
+    times = []
+    for frame in frames:
+        t0 = time.perf_counter()
+        detector.predict(frame, conf=0.4, iou=0.5, verbose=False)
+        times.append(time.perf_counter() - t0)
+    times = np.array(times) * 1000
+    return times.mean(), np.percentile(times, 50), np.percentile(times, 95)
+
+
+def measure_accuracy(detector, data, imgsz):
+    metrics = detector.model.val(data=data, imgsz=imgsz, batch=1, device=detector.device,
+                                 plots=False, verbose=False)
+    return metrics.box.map50, metrics.box.map
+
+
+def main():
+    parser = argparse.ArgumentParser(description="accuracy vs speed of detector backends")
+    parser.add_argument("--models", nargs="+", required=True,
+                        help="best.pt first, then exported models (.onnx, *_openvino_model)")
+    parser.add_argument("--video", default="input.mp4", help="field video used for latency")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--data", help="dataset yaml with labelled field frames for mAP")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--device", default="cpu")
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames)
+    rows = []
+    for model_path in args.models:
+        detector = load_detector(model_path, imgsz=args.imgsz, device=args.device)
+        mean_ms, p50_ms, p95_ms = measure_latency(detector, frames)
+        map50, map5095 = measure_accuracy(detector, args.data, args.imgsz) if args.data else (None, None)
+        rows.append((model_path, backend_for_path(model_path), mean_ms, p50_ms, p95_ms, map50, map5095))
+        print(f"{model_path}: mean={mean_ms:.1f}ms p95={p95_ms:.1f}ms")
+
+    base = rows[0]
+    print(f"\n{'model':40s} {'backend':9s} {'mean ms':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'FPS':>7s} "
+          f"{'mAP50':>7s} {'mAP50-95':>9s} {'speedup':>8s} {'dmAP':>7s}")
+    for model_path, backend, mean_ms, p50_ms, p95_ms, map50, map5095 in rows:
+        speedup = base[2] / mean_ms
+        acc = f"{map50:7.4f} {map5095:9.4f}" if map50 is not None else f"{'-':>7s} {'-':>9s}"
+        delta = f"{map5095 - base[6]:+7.4f}" if map5095 is not None and base[6] is not None else f"{'-':>7s}"
+        print(f"{model_path:40s} {backend:9s} {mean_ms:8.1f} {p50_ms:8.1f} {p95_ms:8.1f} "
+              f"{1000 / mean_ms:7.1f} {acc} {speedup:8.2f} {delta}")
+
+
+if __name__ == "__main__":
+    main()
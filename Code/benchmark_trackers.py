@@ -0,0 +1,151 @@
+import time
+import argparse
+import cv2
+import numpy as np
+from detector import load_detector
+from line_counter import LineCounter
+from tracker import CentroidTracker
+
+
+def sampled_frames(video_path, count, target_fps=15, scale_factor=0.5):
+    # the frames count.py would process, one at a time: every fps/15th frame at half size
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if fps <= 0 or fps > 120:
+        fps = 30.0
+    interval = max(1, int(fps / target_fps))
+    frame_count = 0
+    sampled = 0
+    try:
+        while not count or sampled < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_count += 1
+            if frame_count % interval == 0:
+                sampled += 1
+                yield frame_count, cv2.resize(frame, None, fx=scale_factor, fy=scale_factor)
+    finally:
+        cap.release()
+
+
+def detect(detector, frame, conf, iou):
+    # one predict pass shared by every tracker, so only association is timed
+    result = detector.predict(frame, conf=conf, iou=iou, verbose=False)[0]
+    return result.boxes.cpu().numpy(), result.boxes.xyxy.cpu().numpy(), result.boxes.cls.cpu().numpy()
+
+
+def botsort_tracker(frame_rate):
+    # BOTSORT with botsort.yaml, as model.track builds it; ultralytics passes frame_rate=30 there
+    # regardless of the video, which sets max_time_lost = frame_rate / 30 * track_buffer
+    from ultralytics.trackers.bot_sort import BOTSORT
+    from ultralytics.utils.checks import check_yaml
+    try:
+        from ultralytics.utils import YAML
+        cfg = YAML.load(check_yaml("botsort.yaml"))
+    except ImportError:
+        from ultralytics.utils import yaml_load
+        cfg = yaml_load(check_yaml("botsort.yaml"))
+    from ultralytics.utils import IterableSimpleNamespace
+    tracker = BOTSORT(args=IterableSimpleNamespace(**cfg), frame_rate=frame_rate)
+
+    def update(frame_count, frame, det, boxes):
+        tracks = tracker.update(det, frame)
+        track_ids = np.full(len(boxes), -1)
+        if len(tracks):
+            # columns: x1, y1, x2, y2, id, score, cls, detection index
+            track_ids[tracks[:, -1].astype(int)] = tracks[:, 4]
+        return track_ids
+    return update
+
+
+def centroid_tracker(right_to_left):
+    tracker = CentroidTracker(-1 if right_to_left else 1)
+    return lambda frame_count, frame, det, boxes: tracker.update(boxes, frame_count)
+
+
+def tracker_summary(counter, times):
+    times = np.array(times) * 1000
+    return counter.class_counters, counter.next_id - 1, times.mean(), np.percentile(times, 95)
+
+
+def parse_truth(pairs):
+    truth = {}
+    for pair in pairs or []:
+        label, count = pair.rsplit("=", 1)
+        truth[label] = int(count)
+    return truth
+
+
+def count_error(counts, reference):
+    # summed per-class count difference as a share of the reference total
+    labels = set(counts) | set(reference)
+    missed = sum(abs(counts.get(label, 0) - reference.get(label, 0)) for label in labels)
+    return missed / max(sum(reference.values()), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="line counts and tracker time: BoT-SORT vs the centroid tracker")
+    parser.add_argument("--model", default="best.pt")
+    parser.add_argument("--video", default="input.mp4")
+    parser.add_argument("--frames", type=int, default=0, help="sampled frames to use (0 = whole video)")
+    parser.add_argument("--truth", nargs="*", help="hand counts for the video, e.g. Seedling=120 Root=4")
+    parser.add_argument("--direction", choices=["right_to_left", "left_to_right"], default="right_to_left")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--frame-rate", type=int, default=30, help="BoT-SORT frame rate (model.track uses 30)")
+    args = parser.parse_args()
+
+    detector = load_detector(args.model, imgsz=args.imgsz, device=args.device)
+    names = detector.names
+    right_to_left = args.direction == "right_to_left"
+
+    trackers = [("centroid", centroid_tracker(right_to_left))]
+    try:
+        trackers.insert(0, ("botsort", botsort_tracker(args.frame_rate)))
+    except ImportError as e:
+        print(f"WARNING: BoT-SORT unavailable ({e}), timing the centroid tracker only")
+
+    # frames are streamed: each is detected once, handed to every tracker and dropped
+    counters = None
+    times = {name: [] for name, _ in trackers}
+    frames = detections = 0
+    for frame_count, frame in sampled_frames(args.video, args.frames):
+        det, boxes, classes = detect(detector, frame, conf=0.4, iou=0.5)
+        if counters is None:
+            counters = {name: LineCounter(frame.shape[1] // 2, right_to_left) for name, _ in trackers}
+        for name, update in trackers:
+            t0 = time.perf_counter()
+            track_ids = update(frame_count, frame, det, boxes)
+            times[name].append(time.perf_counter() - t0)
+            counters[name].update(boxes, classes, track_ids, names)
+        frames += 1
+        detections += len(boxes)
+    if not frames:
+        raise RuntimeError(f"could not read frames from {args.video}")
+    print(f"{frames} frames, {detections} detections")
+
+    rows = []
+    for name, _ in trackers:
+        counts, ids, mean_ms, p95_ms = tracker_summary(counters[name], times[name])
+        rows.append((name, counts, ids, mean_ms, p95_ms))
+        print(f"{name}: {sum(counts.values())} crossings, mean={mean_ms:.2f}ms p95={p95_ms:.2f}ms")
+
+    truth = parse_truth(args.truth)
+    reference = truth or rows[0][1]
+    labels = sorted(set(reference) | {label for row in rows for label in row[1]})
+    print(f"\n{'tracker':10s} " + " ".join(f"{label:>16s}" for label in labels) +
+          f" {'total':>6s} {'error':>7s} {'ids':>6s} {'mean ms':>8s} {'p95 ms':>8s}")
+    if truth:
+        print(f"{'truth':10s} " + " ".join(f"{truth.get(label, 0):16d}" for label in labels) +
+              f" {sum(truth.values()):6d}")
+    for name, counts, ids, mean_ms, p95_ms in rows:
+        print(f"{name:10s} " + " ".join(f"{counts.get(label, 0):16d}" for label in labels) +
+              f" {sum(counts.values()):6d} {count_error(counts, reference) * 100:6.1f}% {ids:6d} "
+              f"{mean_ms:8.2f} {p95_ms:8.2f}")
+    if not truth:
+        print(f"(error is relative to {rows[0][0]})")
+
+
+if __name__ == "__main__":
+    main()
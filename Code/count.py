@@ -1,23 +1,134 @@
 import cv2
-from ultralytics import YOLO
 import os
+import math
 import time
-import csv  
+import argparse
+import threading
+import subprocess
+from queue import Queue, Full, Empty
+from detector import BACKENDS, backend_for_path, load_detector
+from adaptive_sampler import AdaptiveSampler, GNSSSpeedSource
+from video_writer import AsyncVideoWriter, DROP_POLICIES
+from event_log import EventLogWriter
+from event_bus import BusClient, DEFAULT_ADDRESS
+from live_source import LatestFrameGrabber, LatencyStats, is_live_source
+from frame_ring import FrameRing, fixed_skip, read_sampled_frame, start_capture_process
+from line_counter import LineCounter
+from tracker import TRACKERS, CentroidTracker
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--model", default=r"best.pt")
+parser.add_argument("--input", default=r"input.mp4")
+parser.add_argument("--output", default=r"output.mp4")
+parser.add_argument("--headless", action="store_true",
+                    help="no display window and no per-frame logs")
+parser.add_argument("--sample-mode", choices=["grab", "seek", "read"], default="grab",
+                    help="how skipped frames are advanced: grab (no retrieve), seek, or read (decode everything)")
+parser.add_argument("--pipeline", action="store_true",
+                    help="run capture, tracking and annotation/encode as separate threaded stages")
+parser.add_argument("--queue-size", type=int, default=4,
+                    help="bounded queue length between pipeline stages")
+parser.add_argument("--processes", action="store_true",
+                    help="decode and resize in a separate capture process that fills a shared-memory frame ring")
+parser.add_argument("--ring-slots", type=int, default=8, help="frames in the shared-memory ring")
+parser.add_argument("--backend", choices=BACKENDS, default=None,
+                    help="inference backend; .pt weights are exported on first use")
+parser.add_argument("--int8", action="store_true", help="use INT8 post-training quantized weights")
+parser.add_argument("--calib", help="directory of field frames for INT8 calibration")
+parser.add_argument("--imgsz", type=int, default=640)
+parser.add_argument("--device", default="cpu")
+parser.add_argument("--roi-band", type=float, default=None,
+                    help="run detection only on a vertical band of this fraction of the width around the counting line")
+parser.add_argument("--roi-margin", type=int, default=64,
+                    help="extra pixels on each side of the ROI band so the tracker keeps its IDs")
+parser.add_argument("--adaptive", action="store_true",
+                    help="choose the sampling interval from GNSS speed and measured track motion")
+parser.add_argument("--target-observations", type=int, default=4,
+                    help="adaptive mode: processed frames per seedling before it reaches the line")
+parser.add_argument("--max-interval", type=int, default=None)
+parser.add_argument("--gnss", default=None, help="GNSS.csv with a speed column for adaptive sampling")
+parser.add_argument("--timestamps", default="frames_timestamps.csv")
+parser.add_argument("--pixels-per-meter", type=float, default=None,
+                    help="initial image scale at the processed resolution; learned from tracks if omitted")
+parser.add_argument("--no-video", action="store_true", help="do not write the annotated output video")
+parser.add_argument("--video-scale", choices=["native", "original"], default="native",
+                    help="write the output video at the processed resolution or upscaled to the input size")
+parser.add_argument("--video-buffer", type=int, default=32, help="frames buffered for the background encoder")
+parser.add_argument("--video-drop", choices=DROP_POLICIES, default="oldest",
+                    help="what to drop when the encoder falls behind (block never drops)")
+parser.add_argument("--event-log", default="crossing_events.log", help="append-only crossing event log")
+parser.add_argument("--log-flush-every", type=int, default=1, help="flush the event log after this many events")
+parser.add_argument("--log-flush-interval", type=float, default=0.5,
+                    help="flush buffered events at least this often (seconds)")
+parser.add_argument("--log-fsync", action="store_true", help="fsync the event log on every flush")
+parser.add_argument("--bus", default=DEFAULT_ADDRESS, help="event bus address crossings are published to")
+parser.add_argument("--no-bus", action="store_true", help="only write the event log")
+parser.add_argument("--row", type=int, default=0, help="planting row this camera watches; tags every crossing")
+parser.add_argument("--direction", choices=["right_to_left", "left_to_right"], default="right_to_left",
+                    help="direction seedlings cross the counting line")
+parser.add_argument("--cpus", default=None, help="comma-separated CPU list to pin this worker to")
+parser.add_argument("--stats-interval", type=float, default=5.0,
+                    help="seconds between throughput stats published on the bus")
+parser.add_argument("--tracker", choices=TRACKERS, default="botsort",
+                    help="botsort/bytetrack run inside model.track; centroid tracks model.predict boxes "
+                         "with the NumPy IoU/centroid tracker")
+parser.add_argument("--line-hysteresis", type=int, default=4,
+                    help="pixels a counted track must move back before the line before it can count again")
+parser.add_argument("--track-max-age", type=int, default=30,
+                    help="processed frames a track is kept in the crossing table after it was last seen")
+parser.add_argument("--live", action="store_true",
+                    help="input is a live source (camera index, stream URL, or a file played at its native rate): "
+                         "always process the newest frame and shed the rest")
+parser.add_argument("--line-guard", type=int, default=40,
+                    help="live mode: stop shedding frames while a track is this many pixels before the line")
+parser.add_argument("--max-hold", type=int, default=4,
+                    help="live mode: frames queued while a track is near the line")
+args = parser.parse_args()
+if args.processes and args.live:
+    parser.error("--processes reads files; use --live on its own for cameras")
+if args.roi_band and backend_for_path(args.model) != "torch":
+    parser.error("--roi-band exports its own fixed-shape model; pass the .pt weights with --backend")
+
+model_path = args.model  
+input_video_path = args.input  
+output_video_path = args.output 
+headless = args.headless
+
+count_right_to_left = args.direction == "right_to_left"
+
+
+def set_cpu_affinity(cpus):
+    # Linux has it in os; elsewhere psutil is used when installed
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+        return True
+    try:
+        import psutil
+    except ImportError:
+        print("WARNING: CPU affinity needs psutil on this platform, running unpinned")
+        return False
+    psutil.Process().cpu_affinity(cpus)
+    return True
+
+
+if args.cpus:
+    cpus = [int(cpu) for cpu in args.cpus.split(",")]
+    if set_cpu_affinity(cpus):
+        print(f"Row {args.row}: pinned to CPUs {cpus}")
 
-model_path = r"best.pt"  
-input_video_path = r"input.mp4"  
-output_video_path = r"output.mp4" 
-
-count_right_to_left = True
 
 if not os.path.exists(model_path):
     raise FileNotFoundError(f" {model_path} not exist")
-if not os.path.exists(input_video_path):
+if not is_live_source(input_video_path) and not os.path.exists(input_video_path):
     raise FileNotFoundError(f" {input_video_path} not exist")
 
-model = YOLO(model_path)
-
-cap = cv2.VideoCapture(input_video_path)
+grabber = None
+if args.live:
+    grabber = LatestFrameGrabber(input_video_path, args.max_hold)
+    cap = grabber.cap
+else:
+    cap = cv2.VideoCapture(input_video_path)
+latency = LatencyStats()
 
 fps = cap.get(cv2.CAP_PROP_FPS) 
 width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) 
@@ -39,104 +150,215 @@ print(f"Input video: original FPS={fps}, processed FPS={actual_fps:.2f} (process
 print(f"Resolution: original size = {width} x {height}, processed size = {new_width} x {new_height}")
 print(f"Total number of frames = {total_frames}, Estimated number of frames to be processed = {total_frames//frame_interval}")
 
-fourcc = cv2.VideoWriter_fourcc(*'mp4v') 
-out = cv2.VideoWriter(output_video_path, fourcc, target_fps, (width, height))  
-if not out.isOpened():
-    print("WARNING: mp4v encoding failed, trying XVID encoding...")
-    fourcc = cv2.VideoWriter_fourcc(*'XVID')
-    output_video_path = output_video_path.replace('.mp4', '.avi')  
-    out = cv2.VideoWriter(output_video_path, fourcc, target_fps, (width, height))
-if not out.isOpened():
-    raise RuntimeError("Check the encoding or path!")
-
-frame_count = 0
-seen_ids = set()
-id_map = {}  
-next_id = 1  
-
-with open('crossing_records.csv', 'w', newline='') as f:
-    writer = csv.writer(f)
-    writer.writerow(['Label', 'Frame_Number'])
-
-class_counters = {}  
-prev_centers = {}  
 line_x = new_width // 2 
 
-start_time = time.time()
 
-while cap.isOpened():
-    frame_count += 1
+def roi_window(line_x, frame_width, frame_height, band, margin, imgsz, stride=32):
+    half_width = int(frame_width * band / 2) + margin
+    x0 = max(0, line_x - half_width)
+    x1 = min(frame_width, line_x + half_width)
+    # keep the full-frame pixels-per-input ratio so the crop is actually fed at a smaller size
+    long_side = max(x1 - x0, frame_height)
+    roi_imgsz = imgsz * long_side / max(frame_width, frame_height)
+    roi_imgsz = max(stride, int(round(roi_imgsz / stride)) * stride)
+    return x0, x1, roi_imgsz
+
+
+def roi_input_shape(roi, frame_height, stride=32):
+    # (h, w) of the crop letterboxed at the ROI imgsz, padded up to the stride
+    x0, x1, roi_imgsz = roi
+    ratio = roi_imgsz / max(x1 - x0, frame_height)
+    return tuple(math.ceil(side * ratio / stride) * stride for side in (frame_height, x1 - x0))
+
+
+roi = None
+if args.roi_band:
+    roi = roi_window(line_x, new_width, new_height, args.roi_band, args.roi_margin, args.imgsz)
+    print(f"ROI: x={roi[0]}..{roi[1]} of {new_width}, imgsz={roi[2]} "
+          f"({(roi[1] - roi[0]) / new_width * 100:.0f}% of the frame width)")
+
+export_imgsz = None
+if roi is not None and args.backend not in (None, "torch"):
+    # exported models take a fixed input shape, so the ROI gets its own export at the crop's shape
+    export_imgsz = roi_input_shape(roi, new_height)
+    roi = (roi[0], roi[1], export_imgsz)
+    print(f"ROI: {args.backend} model exported for a {export_imgsz[0]} x {export_imgsz[1]} input")
+
+model = load_detector(model_path, args.backend, args.imgsz, args.device, args.int8, args.calib, export_imgsz)
+
+out = None
+if not args.no_video:
+    output_size = (width, height) if args.video_scale == "original" else (new_width, new_height)
+    out = AsyncVideoWriter(output_video_path, target_fps, (new_width, new_height), output_size,
+                           args.video_buffer, args.video_drop)
+    print(f"Output video: {out.output_path} at {output_size[0]} x {output_size[1]}")
+
+event_log = EventLogWriter(args.event_log, model.names, args.log_flush_every,
+                           args.log_flush_interval, args.log_fsync)
+# crossings are pushed to subscribers as they happen; the log stays the durable copy
+bus = None if args.no_bus else BusClient(args.bus)
+
+sampler = None
+if args.adaptive:
+    # pixels a seedling travels inside the detected area before reaching the line
+    if count_right_to_left:
+        travel_px = (roi[1] if roi is not None else new_width) - line_x
+    else:
+        travel_px = line_x - (roi[0] if roi is not None else 0)
+    speed_source = GNSSSpeedSource(args.gnss, args.timestamps) if args.gnss else None
+    sampler = AdaptiveSampler(fps, travel_px, args.target_observations, default_interval=frame_interval,
+                              max_interval=args.max_interval, speed_source=speed_source,
+                              pixels_per_meter=args.pixels_per_meter)
+    print(f"Adaptive sampling: {args.target_observations} observations over {travel_px}px, "
+          f"interval {sampler.min_interval}..{sampler.max_interval} frames")
+
+counter = LineCounter(line_x, count_right_to_left, args.line_hysteresis, args.track_max_age)
+tracker = CentroidTracker(-1 if count_right_to_left else 1) if args.tracker == "centroid" else None
+stop_event = threading.Event()
+
+ring = None
+capture_process = None
+if args.processes:
+    ring = FrameRing.create(args.ring_slots, (new_height, new_width, 3), frame_interval)
+    print(f"Frame ring: {args.ring_slots} slots of {new_width} x {new_height} in shared memory {ring.name}")
+
+
+def capture_live_frames():
+    # frame_start_time is the capture time, so latency covers waiting as well as processing
+    frame_count = 0
+    while not stop_event.is_set():
+        grabber.interval = sampler.next_interval(frame_count) if sampler is not None else frame_interval
+        item = grabber.read(frame_count + grabber.interval)
+        if item is None:
+            break
+        frame_count, frame, captured = item
+        yield frame_count, cv2.resize(frame, (new_width, new_height)), captured
+
+
+def capture_ring_frames():
+    # frames arrive as views into the ring and are released by detect_and_count
+    frame_count = 0
+    stopped = lambda: stop_event.is_set() or capture_process.poll() is not None
+    while True:
+        if sampler is not None:
+            ring.set_interval(sampler.next_interval(frame_count))
+        item = ring.get(stopped)
+        if item is None:
+            break
+        frame_count = item[0]
+        yield item
+
+
+def capture_frames():
+    if grabber is not None:
+        yield from capture_live_frames()
+        return
+    if ring is not None:
+        yield from capture_ring_frames()
+        return
+    frame_count = 0
+    while cap.isOpened() and not stop_event.is_set():
+        if sampler is not None:
+            skip = sampler.next_interval(frame_count) - 1
+        else:
+            skip = fixed_skip(frame_count, frame_interval)
+        frame_count, ret, frame = read_sampled_frame(cap, frame_count, skip, args.sample_mode)
+        if not ret:
+            break
+        yield frame_count, cv2.resize(frame, (new_width, new_height)), time.time()
+
+
+def detect_and_count(frame_count, frame_resized, frame_start_time):
+    track_input = frame_resized
+    track_kwargs = {}
+    if roi is not None:
+        track_input = frame_resized[:, roi[0]:roi[1]]
+        track_kwargs["imgsz"] = roi[2]
+
+    if tracker is None:
+        results = model.track(
+            track_input,
+            persist=True,  
+            conf=0.4,      
+            iou=0.5,      
+            tracker=f"{args.tracker}.yaml", 
+            verbose=not headless,
+            **track_kwargs
+        )
+    else:
+        results = model.predict(track_input, conf=0.4, iou=0.5, verbose=not headless, **track_kwargs)
+
+    detections = []
+    frame_ids = []
+    for result in results:
+        boxes = result.boxes.xyxy.cpu().numpy()  
+        confidences = result.boxes.conf.cpu().numpy()  
+        classes = result.boxes.cls.cpu().numpy()  
+        if roi is not None:
+            boxes[:, [0, 2]] += roi[0]
+        if tracker is not None:
+            # associated in full-frame coordinates, so ROI and full-frame runs give the same motion
+            track_ids = tracker.update(boxes, frame_count)
+        elif result.boxes.id is not None:
+            track_ids = result.boxes.id.cpu().numpy()
+        else:
+            track_ids = None
+        if sampler is not None and track_ids is not None:
+            sampler.observe(frame_count, track_ids, (boxes[:, 0] + boxes[:, 2]) / 2)
+        if track_ids is None:
+            track_ids = [-1] * len(boxes)
+
+        crossings, ids = counter.update(boxes, classes, track_ids, model.names)
+        if grabber is not None:
+            grabber.hold(counter.near_line(args.line_guard))
+        for continuous_id, track_id, label in crossings:
+            direction = "Out" if count_right_to_left else "In"
+            print(f"ID {continuous_id} ({label}) ！{label} {direction}: {counter.class_counters[label]}")
+            # stamped with the frame's capture time, which is all main.py has for a camera's frames
+            event = event_log.append(frame_count, label, continuous_id, row=args.row, timestamp=frame_start_time)
+            if bus is not None:
+                bus.publish("crossing", (event_log.session, event))
+
+        for i in range(len(boxes)):
+            x1, y1, x2, y2 = map(int, boxes[i])
+            detections.append((x1, y1, x2, y2, model.names[int(classes[i])], confidences[i]))
+        frame_ids.extend((tid, cid, label, confidences[i]) for i, (tid, cid, label) in enumerate(ids))
+
+    event_log.poll()
 
-    ret, frame = cap.read()
-    if not ret:
-        break
+    if ring is not None:
+        # annotation and the video writer get their own copy so the slot can be refilled
+        frame_resized = frame_resized.copy()
+        ring.release()
 
-    if frame_count % frame_interval != 0:
-        continue
-        
-    frame_start_time = time.time()
+    # counters are copied so the render stage never sees a later frame's totals
+    return frame_count, frame_resized, frame_start_time, detections, dict(counter.class_counters), frame_ids
 
-    frame_resized = cv2.resize(frame, (new_width, new_height))
 
-    results = model.track(
-        frame_resized,
-        persist=True,  
-        conf=0.4,      
-        iou=0.5,      
-        tracker="botsort.yaml", 
-        half=True      
-    )
+last_stats = 0.0
 
+
+def publish_stats(final=False):
+    # (row, processed frames, elapsed, crossings, mean latency ms) for the orchestrator's report
+    global last_stats
+    now = time.time()
+    if bus is None or (not final and now - last_stats < args.stats_interval):
+        return
+    last_stats = now
+    bus.publish("stats", (args.row, processed_frames, now - start_time, sum(counter.class_counters.values()),
+                          latency.summary()["mean_ms"]))
+
+
+def render(frame_count, frame_resized, frame_start_time, detections, class_counters, frame_ids):
     cv2.line(frame_resized, (line_x, 0), (line_x, new_height), (0, 0, 255), 2)
+    if roi is not None:
+        cv2.rectangle(frame_resized, (roi[0], 0), (roi[1] - 1, new_height - 1), (0, 255, 255), 1)
+    for x1, y1, x2, y2, label, conf in detections:
+        cv2.rectangle(frame_resized, (x1, y1), (x2, y2), (0, 255, 0), 2)
 
-    frame_ids = [] 
-    for result in results:
-        boxes = result.boxes.xyxy.cpu().numpy()  
-        confidences = result.boxes.conf.cpu().numpy()  
-        classes = result.boxes.cls.cpu().numpy()  
-        track_ids = result.boxes.id.cpu().numpy() if result.boxes.id is not None else [-1] * len(boxes)  
+        label_text = f"{label}  {conf:.2f}"
 
-        for i in range(len(boxes)):
-            x1, y1, x2, y2 = map(int, boxes[i]) 
-            conf = confidences[i] 
-            cls = int(classes[i]) 
-            label = model.names[cls]  
-            track_id = int(track_ids[i]) if track_ids[i] != -1 else -1  
-
-            if track_id != -1 and track_id not in id_map:
-                id_map[track_id] = next_id
-                next_id += 1
-            continuous_id = id_map.get(track_id, -1)
-
-            frame_ids.append((track_id, continuous_id, label, conf))
-
-            if track_id not in seen_ids and track_id != -1:
-                seen_ids.add(track_id)
-
-            if track_id != -1:
-                curr_center_x = (x1 + x2) / 2
-                if track_id in prev_centers:
-                    prev_center_x = prev_centers[track_id]
-                    if count_right_to_left:
-                        if prev_center_x >= line_x and curr_center_x < line_x:
-                            class_counters[label] = class_counters.get(label, 0) + 1
-                            print(f"ID {continuous_id} ({label}) ！{label} Out: {class_counters[label]}")
-                            with open('crossing_records.csv', 'a', newline='') as f:
-                                writer = csv.writer(f)
-                                writer.writerow([label, frame_count])
-                    else:
-                        if prev_center_x <= line_x and curr_center_x > line_x:
-                            class_counters[label] = class_counters.get(label, 0) + 1
-                            print(f"ID {continuous_id} ({label}) ！{label} In: {class_counters[label]}")
-                            with open('crossing_records.csv', 'a', newline='') as f:
-                                writer = csv.writer(f)
-                                writer.writerow([label, frame_count])
-                prev_centers[track_id] = curr_center_x
-            cv2.rectangle(frame_resized, (x1, y1), (x2, y2), (0, 255, 0), 2)
-
-            label_text = f"{label}  {conf:.2f}"
-
-            cv2.putText(frame_resized, label_text, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+        cv2.putText(frame_resized, label_text, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
 
     y_offset = 30
     for label, count in class_counters.items():
@@ -144,19 +366,164 @@ while cap.isOpened():
                     cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
         y_offset += 30
 
-    if frame_ids:
+    if frame_ids and not headless:
         print(f"Frame {frame_count}: IDs = {[(tid, cid, label, f'{conf:.2f}') for tid, cid, label, conf in frame_ids]}")
 
-    frame_output = cv2.resize(frame_resized, (width, height))
-    out.write(frame_output)
-    cv2.imshow("Detection", frame_resized)
+    if out is not None:
+        out.write(frame_resized)
 
     frame_time = time.time() - frame_start_time
-    print(f"Frame {frame_count}/{total_frames} ({frame_count/total_frames*100:.1f}%): time={frame_time:.3f}s, FPS={1/frame_time:.2f}")
+    latency.add(frame_time)
+    publish_stats()
 
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
+    if headless:
+        return True
 
-cap.release()
-out.release()
-cv2.destroyAllWindows()
+    cv2.imshow("Detection", frame_resized)
+
+    progress = f"/{total_frames} ({frame_count/total_frames*100:.1f}%)" if total_frames > 0 else ""
+    print(f"Frame {frame_count}{progress}: time={frame_time:.3f}s, FPS={1/max(frame_time, 1e-6):.2f}")
+
+    return not (cv2.waitKey(1) & 0xFF == ord("q"))
+
+
+def put_until_stopped(queue, item):
+    while not stop_event.is_set():
+        try:
+            queue.put(item, timeout=0.1)
+            return
+        except Full:
+            continue
+
+
+def get_until_stopped(queue):
+    while not stop_event.is_set():
+        try:
+            return queue.get(timeout=0.1)
+        except Empty:
+            continue
+    return None
+
+
+# a failing stage still queues its sentinel, so the stages after it and the main thread
+# finish; the main thread re-raises the error once everything has stopped
+stage_errors = []
+
+
+def capture_stage(frame_queue):
+    try:
+        for item in capture_frames():
+            put_until_stopped(frame_queue, item)
+    except Exception as e:
+        stage_errors.append(e)
+    finally:
+        put_until_stopped(frame_queue, None)
+
+
+def live_inference_stage(result_queue):
+    # live input has no capture queue: the grabber's single slot is the only buffer
+    try:
+        for item in capture_frames():
+            put_until_stopped(result_queue, detect_and_count(*item))
+    except Exception as e:
+        stage_errors.append(e)
+    finally:
+        put_until_stopped(result_queue, None)
+
+
+def inference_stage(frame_queue, result_queue):
+    # single consumer of an ordered FIFO: tracker state sees frames in order
+    try:
+        while True:
+            item = get_until_stopped(frame_queue)
+            if item is None:
+                break
+            put_until_stopped(result_queue, detect_and_count(*item))
+    except Exception as e:
+        stage_errors.append(e)
+    finally:
+        put_until_stopped(result_queue, None)
+
+
+processed_frames = 0
+start_time = time.time()
+# whatever stops the run, the capture side is stopped and the shared memory and files are released
+try:
+    if grabber is not None:
+        grabber.start()
+    if ring is not None:
+        capture_process = start_capture_process(ring, input_video_path, args.sample_mode, args.adaptive)
+
+    if args.pipeline:
+        frame_queue = Queue(maxsize=args.queue_size)
+        result_queue = Queue(maxsize=args.queue_size)
+        if grabber is not None:
+            stages = [threading.Thread(target=live_inference_stage, args=(result_queue,), daemon=True)]
+        else:
+            stages = [
+                threading.Thread(target=capture_stage, args=(frame_queue,), daemon=True),
+                threading.Thread(target=inference_stage, args=(frame_queue, result_queue), daemon=True),
+            ]
+        for stage in stages:
+            stage.start()
+
+        # annotation/encode stays on the main thread because cv2.imshow requires it
+        while True:
+            item = result_queue.get()
+            if item is None:
+                break
+            processed_frames += 1
+            if not render(*item):
+                stop_event.set()
+                break
+
+        stop_event.set()
+        for stage in stages:
+            stage.join(timeout=5)
+        if stage_errors:
+            raise stage_errors[0]
+    else:
+        for item in capture_frames():
+            processed_frames += 1
+            if not render(*detect_and_count(*item)):
+                break
+
+    elapsed = time.time() - start_time
+    print(f"Processed {processed_frames} frames in {elapsed:.1f}s ({processed_frames / max(elapsed, 1e-6):.2f} FPS)")
+    if sampler is not None:
+        print(f"Adaptive sampling: mean interval {sampler.mean_interval():.2f} frames, "
+              f"pixels/m={sampler.pixels_per_meter}")
+    lat = latency.summary()
+    print(f"End-to-end latency: mean {lat['mean_ms']:.1f} ms, p95 {lat['p95_ms']:.1f} ms, max {lat['max_ms']:.1f} ms")
+    if grabber is not None:
+        grabber.stop()
+        live = grabber.stats()
+        print(f"Live source: {live['captured']} frames captured, {live['processed']} processed, "
+              f"{live['dropped']} sampled frames dropped, {live['held']} held near the line "
+              f"({live['hold_overflow']} hold overflows)")
+    if ring is not None:
+        print(f"Frame ring: detector waited {ring.waits} times for a frame")
+finally:
+    stop_event.set()
+    if grabber is not None:
+        grabber.stop()
+    if ring is not None:
+        if capture_process is not None:
+            if capture_process.poll() is None:
+                capture_process.terminate()
+            try:
+                capture_process.wait(5)
+            except subprocess.TimeoutExpired:
+                capture_process.kill()
+                capture_process.wait()
+        ring.close()
+
+    event_log.close()
+    if bus is not None:
+        publish_stats(final=True)
+        bus.close()
+    cap.release()
+    if out is not None:
+        out.close()
+    if not headless:
+        cv2.destroyAllWindows()
@@ -0,0 +1,199 @@
+import os
+import glob
+import argparse
+import shutil
+import tempfile
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+BACKENDS = ("torch", "onnx", "openvino")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def backend_for_path(model_path):
+    if model_path.endswith(".onnx"):
+        return "onnx"
+    if model_path.rstrip("/\\").endswith("_openvino_model"):
+        return "openvino"
+    return "torch"
+
+
+def exported_path(weights, backend, int8=False, imgsz=None):
+    stem = os.path.splitext(weights)[0]
+    if isinstance(imgsz, (tuple, list)):
+        # fixed (h, w) input exports, e.g. for an ROI crop, sit next to the square one
+        stem = f"{stem}_{imgsz[0]}x{imgsz[1]}"
+    if backend == "onnx":
+        return f"{stem}_int8.onnx" if int8 else f"{stem}.onnx"
+    if backend == "openvino":
+        return f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model"
+    return weights
+
+
+def calibration_images(calib_dir, limit=None):
+    paths = sorted(p for p in glob.glob(os.path.join(calib_dir, "*"))
+                   if p.lower().endswith(IMAGE_EXTENSIONS))
+    if not paths:
+        raise FileNotFoundError(f" no calibration images in {calib_dir}")
+    return paths[:limit] if limit else paths
+
+
+def extract_calibration_frames(video_path, out_dir, count=300):
+    # evenly spaced field frames, used as the INT8 calibration set
+    os.makedirs(out_dir, exist_ok=True)
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    step = max(1, total // count)
+    saved = 0
+    for index in range(0, total, step):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ret, frame = cap.read()
+        if not ret:
+            break
+        cv2.imwrite(os.path.join(out_dir, f"frame_{index:06d}.jpg"), frame)
+        saved += 1
+        if saved >= count:
+            break
+    cap.release()
+    print(f"saved {saved} calibration frames to {out_dir}")
+    return saved
+
+
+def letterbox(frame, imgsz):
+    out_h, out_w = imgsz if isinstance(imgsz, (tuple, list)) else (imgsz, imgsz)
+    h, w = frame.shape[:2]
+    r = min(out_h / h, out_w / w)
+    new_w, new_h = int(round(w * r)), int(round(h * r))
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((out_h, out_w, 3), 114, dtype=np.uint8)
+    top = (out_h - new_h) // 2
+    left = (out_w - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = resized
+    blob = canvas[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+    return np.ascontiguousarray(blob)
+
+
+def quantize_onnx(onnx_path, calib_dir, out_path, imgsz=640, calib_size=300):
+    import onnx
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+
+    fp32_model = onnx.load(onnx_path)
+    input_name = fp32_model.graph.input[0].name
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self, paths):
+            self.paths = iter(paths)
+
+        def get_next(self):
+            path = next(self.paths, None)
+            if path is None:
+                return None
+            return {input_name: letterbox(cv2.imread(path), imgsz)}
+
+    quantize_static(onnx_path, out_path, FrameReader(calibration_images(calib_dir, calib_size)),
+                    quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+    # ultralytics reads names/stride/imgsz from the metadata, which quantization drops
+    quantized = onnx.load(out_path)
+    existing = {p.key for p in quantized.metadata_props}
+    for prop in fp32_model.metadata_props:
+        if prop.key not in existing:
+            quantized.metadata_props.add(key=prop.key, value=prop.value)
+    onnx.save(quantized, out_path)
+    return out_path
+
+
+def export_model(weights, backend, imgsz=640, int8=False, calib_dir=None, calib_size=300):
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend}")
+    if backend == "torch":
+        return weights
+    if int8 and not calib_dir:
+        raise ValueError("INT8 export needs a calibration directory of field frames")
+
+    target = exported_path(weights, backend, int8, imgsz)
+    # ultralytics writes next to the weights as best.onnx / best_openvino_model whatever the
+    # imgsz, so export a copy in a scratch directory and move only the result to target
+    workdir = tempfile.mkdtemp(prefix=".export_", dir=os.path.dirname(os.path.abspath(target)))
+    try:
+        scratch = os.path.join(workdir, os.path.basename(weights))
+        shutil.copyfile(weights, scratch)
+        model = YOLO(scratch)
+        if backend == "onnx":
+            onnx_path = model.export(format="onnx", imgsz=imgsz, dynamic=False, simplify=True)
+            if int8:
+                quantize_onnx(onnx_path, calib_dir, target, imgsz, calib_size)
+            else:
+                os.replace(onnx_path, target)
+        else:
+            if int8:
+                # ultralytics drives NNCF from a dataset yaml; unlabeled frames are enough for PTQ
+                calib_dir = os.path.abspath(calib_dir)
+                data_yaml = os.path.join(workdir, "calib.yaml")
+                with open(data_yaml, "w") as f:
+                    f.write(f"path: {calib_dir}\ntrain: {calib_dir}\nval: {calib_dir}\n")
+                    f.write("names:\n")
+                    for index, name in model.names.items():
+                        f.write(f"  {index}: {name}\n")
+                exported = model.export(format="openvino", imgsz=imgsz, int8=True,
+                                        data=data_yaml, fraction=1.0)
+            else:
+                exported = model.export(format="openvino", imgsz=imgsz)
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            os.replace(exported, target)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(f"exported {weights} -> {target}")
+    return target
+
+
+class Detector:
+    def __init__(self, model_path, imgsz=640, device="cpu"):
+        self.model_path = model_path
+        self.backend = backend_for_path(model_path)
+        self.imgsz = imgsz
+        self.device = device
+        self.model = YOLO(model_path, task="detect")
+        self.names = self.model.names
+        # FP16 only helps the PyTorch backend on a GPU; exported CPU backends ignore it
+        self.half = self.backend == "torch" and str(device) != "cpu"
+
+    def track(self, frame, **kwargs):
+        kwargs.setdefault("imgsz", self.imgsz)
+        return self.model.track(frame, device=self.device, half=self.half, **kwargs)
+
+    def predict(self, frame, **kwargs):
+        kwargs.setdefault("imgsz", self.imgsz)
+        return self.model.predict(frame, device=self.device, half=self.half, **kwargs)
+
+
+def load_detector(model_path, backend=None, imgsz=640, device="cpu", int8=False, calib_dir=None,
+                  export_imgsz=None):
+    # exported models take one fixed input shape: export_imgsz, e.g. the ROI crop's (h, w), or imgsz
+    if backend and backend != "torch" and backend_for_path(model_path) == "torch":
+        imgsz = export_imgsz or imgsz
+        target = exported_path(model_path, backend, int8, imgsz)
+        if not os.path.exists(target):
+            target = export_model(model_path, backend, imgsz, int8, calib_dir)
+        model_path = target
+    return Detector(model_path, imgsz, device)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="export YAN-YOLO11 weights for CPU inference")
+    parser.add_argument("--weights", default="best.pt")
+    parser.add_argument("--backend", choices=BACKENDS[1:], default="onnx")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--calib", help="directory of calibration frames")
+    parser.add_argument("--calib-video", help="extract calibration frames from this video into --calib")
+    parser.add_argument("--calib-size", type=int, default=300)
+    args = parser.parse_args()
+
+    if args.calib_video:
+        extract_calibration_frames(args.calib_video, args.calib, args.calib_size)
+    export_model(args.weights, args.backend, args.imgsz, args.int8, args.calib, args.calib_size)
@@ -0,0 +1,214 @@
+import os
+import sys
+import time
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+# Crossing and record events between processes. main.py hosts the broker;
+# count.py publishes "crossing" events, the enricher publishes "record" events
+# and the dashboard subscribes, in the same process or from another one. The
+# transport is multiprocessing.connection (Unix socket, named pipe on Windows),
+# so delivery is push-based instead of polling a file.
+DEFAULT_ADDRESS = r"\\.\pipe\crossing_bus" if sys.platform == "win32" else "crossing_bus.sock"
+# connections unpickle every message, so only processes given this run's key may connect;
+# the broker makes a random key and hands it to the processes it starts in this variable
+AUTHKEY_ENV = "CROSSING_BUS_AUTHKEY"
+
+
+def env_authkey():
+    key = os.environ.get(AUTHKEY_ENV)
+    return bytes.fromhex(key) if key else None
+
+
+class EventBus:
+    def __init__(self, address=DEFAULT_ADDRESS, authkey=None):
+        self.address = address
+        self.authkey = authkey or os.urandom(32)
+        self.listener = None
+        self.lock = threading.Lock()
+        self.local = {}  # topic -> callbacks in this process
+        self.remote = {}  # topic -> connections of subscribed processes
+        self.send_locks = {}
+        self.connections = set()
+        self.running = False
+        self.published = 0
+
+    def start(self):
+        if sys.platform != "win32" and os.path.exists(self.address):
+            # socket file left by a run that did not shut down
+            os.unlink(self.address)
+        self.listener = Listener(self.address, authkey=self.authkey)
+        if sys.platform != "win32":
+            os.chmod(self.address, 0o600)
+        self.running = True
+        thread = threading.Thread(target=self._accept, daemon=True)
+        thread.start()
+        return self
+
+    def environ(self):
+        # environment for a process that should be able to connect
+        return dict(os.environ, **{AUTHKEY_ENV: self.authkey.hex()})
+
+    def _accept(self):
+        while self.running:
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                if not self.running:
+                    break
+                continue
+            with self.lock:
+                self.connections.add(conn)
+                self.send_locks[conn] = threading.Lock()
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        # messages from a client: ("pub", topic, payload) or ("sub", topic)
+        try:
+            while self.running:
+                message = conn.recv()
+                if message[0] == "pub":
+                    self.publish(message[1], message[2])
+                elif message[0] == "sub":
+                    with self.lock:
+                        self.remote.setdefault(message[1], []).append(conn)
+        except (EOFError, OSError):
+            pass
+        finally:
+            self._drop(conn)
+
+    def _drop(self, conn):
+        with self.lock:
+            self.connections.discard(conn)
+            self.send_locks.pop(conn, None)
+            for subscribers in self.remote.values():
+                if conn in subscribers:
+                    subscribers.remove(conn)
+        conn.close()
+
+    def subscribe(self, topic, callback):
+        # callback(payload) runs on the publishing thread, so it should only hand off
+        with self.lock:
+            self.local.setdefault(topic, []).append(callback)
+
+    def publish(self, topic, payload):
+        with self.lock:
+            callbacks = list(self.local.get(topic, ()))
+            subscribers = [(conn, self.send_locks.get(conn)) for conn in self.remote.get(topic, ())]
+            self.published += 1
+        for callback in callbacks:
+            callback(payload)
+        for conn, send_lock in subscribers:
+            try:
+                with send_lock:
+                    conn.send((topic, payload))
+            except (OSError, ValueError, TypeError):
+                self._drop(conn)
+
+    def close(self):
+        self.running = False
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+        with self.lock:
+            connections = list(self.connections)
+        for conn in connections:
+            conn.close()
+        if sys.platform != "win32" and os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+# Client side of the bus for other processes. Publishing never blocks on a
+# missing broker: the event is skipped (count.py still writes its event log,
+# and main.py reads skipped crossings back from it when the next one arrives)
+# and the connection is retried at most every retry_interval seconds.
+class BusClient:
+    def __init__(self, address=DEFAULT_ADDRESS, authkey=None, retry_interval=1.0):
+        self.address = address
+        self.authkey = authkey or env_authkey()
+        self.retry_interval = retry_interval
+        self.conn = None
+        self.lock = threading.Lock()
+        self.last_attempt = 0.0
+        self.reported = False
+        self.callbacks = {}
+        self.reader = None
+        self.running = True
+        self.published = 0
+        self.skipped = 0
+
+    def _connect(self):
+        # called with self.lock held
+        if self.conn is not None:
+            return True
+        now = time.time()
+        if now - self.last_attempt < self.retry_interval:
+            return False
+        self.last_attempt = now
+        if self.authkey is None:
+            if not self.reported:
+                print(f"event bus key not set ({AUTHKEY_ENV}), crossings are only logged")
+                self.reported = True
+            return False
+        try:
+            self.conn = Client(self.address, authkey=self.authkey)
+        except (OSError, EOFError, AuthenticationError) as e:
+            if not self.reported:
+                print(f"event bus not reachable at {self.address} ({e}), retrying")
+                self.reported = True
+            return False
+        self.reported = False
+        for topic in self.callbacks:
+            self.conn.send(("sub", topic))
+        return True
+
+    def publish(self, topic, payload):
+        with self.lock:
+            if not self._connect():
+                self.skipped += 1
+                return False
+            try:
+                self.conn.send(("pub", topic, payload))
+                self.published += 1
+                return True
+            except (OSError, ValueError):
+                self.conn.close()
+                self.conn = None
+                self.skipped += 1
+                return False
+
+    def subscribe(self, topic, callback):
+        with self.lock:
+            self.callbacks.setdefault(topic, []).append(callback)
+            if self.conn is not None:
+                self.conn.send(("sub", topic))
+        if self.reader is None:
+            self.reader = threading.Thread(target=self._read, daemon=True)
+            self.reader.start()
+
+    def _read(self):
+        while self.running:
+            with self.lock:
+                connected = self._connect()
+                conn = self.conn
+            if not connected:
+                time.sleep(self.retry_interval)
+                continue
+            try:
+                topic, payload = conn.recv()
+            except (EOFError, OSError):
+                with self.lock:
+                    if self.conn is conn:
+                        self.conn.close()
+                        self.conn = None
+                continue
+            for callback in self.callbacks.get(topic, ()):
+                callback(payload)
+
+    def close(self):
+        self.running = False
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
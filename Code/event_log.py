@@ -0,0 +1,202 @@
+import os
+import sys
+import csv
+import json
+import time
+import struct
+from collections import namedtuple
+import numpy as np
+
+# File layout: header (magic, version, session start time, label names as JSON)
+# followed by fixed-size little-endian records, so any byte offset that is a
+# whole number of records past the header is a valid resume point.
+MAGIC = b"CRLG"
+VERSION = 1
+HEADER = struct.Struct("<4sHdI")  # magic, version, session, names length
+RECORD = struct.Struct("<dIiHBx")  # frame capture time, frame, track id, row, label code
+RECORD_DTYPE = np.dtype([("time", "<f8"), ("frame", "<u4"), ("track_id", "<i4"),
+                         ("row", "<u2"), ("label", "u1"), ("pad", "u1")])
+
+CrossingEvent = namedtuple("CrossingEvent", ["time", "frame", "track_id", "row", "label", "offset"])
+
+
+def label_names(names):
+    if isinstance(names, dict):
+        return [names[k] for k in sorted(names)]
+    return list(names)
+
+
+class EventLogWriter:
+    def __init__(self, path, names, flush_every=1, flush_interval=0.5, fsync=False):
+        self.path = path
+        self.names = label_names(names)
+        self.codes = {name: code for code, name in enumerate(self.names)}
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.session = time.time()
+        self.pending = bytearray()
+        self.pending_count = 0
+        self.last_flush = time.time()
+        self.count = 0
+
+        encoded = json.dumps(self.names).encode("utf-8")
+        self.data_start = HEADER.size + len(encoded)
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.session, len(encoded)) + encoded)
+        self.flush()
+
+    def append(self, frame, label, track_id=-1, row=0, timestamp=None):
+        # returns the event as a reader would see it, with its resume offset
+        code = self.codes[label] if isinstance(label, str) else int(label)
+        timestamp = timestamp or time.time()
+        self.pending += RECORD.pack(timestamp, int(frame), int(track_id), int(row), code)
+        self.pending_count += 1
+        self.count += 1
+        if self.pending_count >= self.flush_every:
+            self.flush()
+        label = self.names[code] if code < len(self.names) else str(code)
+        return CrossingEvent(timestamp, int(frame), int(track_id), int(row), label,
+                             self.data_start + self.count * RECORD.size)
+
+    def poll(self):
+        # called once per processed frame so a quiet stream still reaches disk
+        if self.pending_count and time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.file.write(self.pending)
+            self.pending = bytearray()
+            self.pending_count = 0
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        self.last_flush = time.time()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def read_header(f):
+    raw = f.read(HEADER.size)
+    if len(raw) < HEADER.size:
+        return None
+    magic, version, session, names_length = HEADER.unpack(raw)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a crossing event log")
+    encoded = f.read(names_length)
+    if len(encoded) < names_length:
+        return None
+    return session, json.loads(encoded.decode("utf-8")), HEADER.size + names_length
+
+
+class EventLogReader:
+    def __init__(self, path, offset_path=None, commit_interval=0.5):
+        self.path = path
+        self.offset_path = offset_path
+        self.commit_interval = commit_interval
+        self.session = None
+        self.names = None
+        self.data_start = None
+        self.offset = 0
+        self.committed = None
+        self.last_commit = 0.0
+        self.stored = self._load_offset()
+
+    def _load_offset(self):
+        if self.offset_path and os.path.exists(self.offset_path):
+            with open(self.offset_path) as f:
+                session, offset = f.read().split()
+            return float(session), int(offset)
+        return None
+
+    def _open_session(self, f):
+        header = read_header(f)
+        if header is None:
+            return False
+        self.session, self.names, self.data_start = header
+        self.offset = self.data_start
+        # resume only inside the same detection session; a new run rewrites the log
+        if self.stored and self.stored[0] == self.session and self.stored[1] >= self.data_start:
+            self.offset = self.stored[1]
+        return True
+
+    def read_new(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "rb") as f:
+            if self.session is None or self.names is None or os.fstat(f.fileno()).st_size < self.offset:
+                self.session = None
+                if not self._open_session(f):
+                    return []
+            else:
+                # a restarted count.py truncates and rewrites the header
+                header = read_header(f)
+                if header is None:
+                    return []
+                if header[0] != self.session:
+                    f.seek(0)
+                    self.session = None
+                    self.stored = None
+                    if not self._open_session(f):
+                        return []
+            f.seek(self.offset)
+            data = f.read()
+        whole = len(data) - len(data) % RECORD.size
+        events = []
+        for i in range(0, whole, RECORD.size):
+            t, frame, track_id, row, code = RECORD.unpack_from(data, i)
+            label = self.names[code] if code < len(self.names) else str(code)
+            events.append(CrossingEvent(t, frame, track_id, row, label, self.offset + i + RECORD.size))
+        self.offset += whole
+        return events
+
+    def seek(self, session, offset):
+        # read_new goes on after offset in session; the events before it arrived by other means
+        self.session = None
+        self.stored = (session, offset)
+
+    def commit(self, offset=None, force=False, session=None):
+        # session is given for events that arrived by other means than read_new (the event bus)
+        if session is not None and session != self.session:
+            self.session = session
+            self.offset = offset
+            self.stored = None
+            self.committed = None
+        if not self.offset_path or self.session is None:
+            return
+        offset = self.offset if offset is None else offset
+        self.committed = offset
+        now = time.time()
+        if not force and now - self.last_commit < self.commit_interval:
+            return
+        tmp_path = self.offset_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(f"{self.session!r} {offset}")
+        os.replace(tmp_path, self.offset_path)
+        self.last_commit = now
+
+    def close(self):
+        if self.committed is not None:
+            self.commit(self.committed, force=True)
+
+
+def read_all(path):
+    with open(path, "rb") as f:
+        header = read_header(f)
+        if header is None:
+            return [], np.zeros(0, dtype=RECORD_DTYPE)
+        _, names, data_start = header
+    size = os.path.getsize(path) - data_start
+    records = np.fromfile(path, dtype=RECORD_DTYPE, count=size // RECORD.size, offset=data_start)
+    return names, records
+
+
+if __name__ == "__main__":
+    names, records = read_all(sys.argv[1] if len(sys.argv) > 1 else "crossing_events.log")
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["Label", "Frame_Number", "Track_ID", "Row", "Time"])
+    for record in records:
+        writer.writerow([names[record["label"]], record["frame"], record["track_id"], record["row"], record["time"]])
@@ -0,0 +1,161 @@
+import json
+import threading
+import time
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from seedling_table import LABELS, STATUS_NAMES, OVERLAP, NO_STATUS
+
+FORMATS = ("geojson", "csv", "parquet", "png")
+COLORS = {
+    "Normal": "green",
+    "Root Exposed": "red",
+    "Buried": "blue",
+    "Overlap": "orange",
+    "Missing": "purple"
+}
+
+
+def field_frame(table, missed_points):
+    # one row per seedling plus one per missing position; overlap runs get a group number,
+    # counted along each planting row in turn
+    status = table.status
+    order = np.argsort(table.row, kind="stable")
+    overlap = status[order] == OVERLAP
+    same_row = table.row[order][1:] == table.row[order][:-1]
+    starts = overlap & ~np.concatenate(([False], overlap[:-1] & same_row))
+    groups = np.empty(len(status), dtype=np.int64)
+    groups[order] = np.where(overlap, np.cumsum(starts), 0)
+
+    labels = np.array(LABELS + ("",), dtype=object)
+    names = np.array(STATUS_NAMES + ("",), dtype=object)
+    seedlings = pd.DataFrame({
+        "kind": "seedling",
+        "frame": table.frame,
+        "label": labels[table.label],
+        "status": np.where(status == NO_STATUS, "", names[status]),
+        "latitude": table.lat,
+        "longitude": table.lon,
+        "overlap_group": groups,
+        "row": table.row,
+        "frame_prev": -1,
+        "frame_curr": -1
+    })
+    missing = pd.DataFrame({
+        "kind": "missing",
+        "frame": [p["frame_curr"] for p in missed_points],
+        "label": "",
+        "status": "Missing",
+        "latitude": [p["lat"] for p in missed_points],
+        "longitude": [p["lon"] for p in missed_points],
+        "overlap_group": 0,
+        "row": [p.get("row", 0) for p in missed_points],
+        "frame_prev": [p["frame_prev"] for p in missed_points],
+        "frame_curr": [p["frame_curr"] for p in missed_points]
+    })
+    frame = pd.concat([seedlings, missing], ignore_index=True)
+    return frame.astype({"frame": np.int64, "overlap_group": np.int64, "row": np.int64,
+                         "frame_prev": np.int64, "frame_curr": np.int64})
+
+
+def write_geojson(frame, path):
+    features = []
+    columns = [c for c in frame.columns if c not in ("latitude", "longitude")]
+    for row in frame.itertuples(index=False):
+        row = row._asdict()
+        properties = {c: row[c].item() if hasattr(row[c], "item") else row[c] for c in columns}
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [float(row["longitude"]), float(row["latitude"])]},
+            "properties": properties
+        })
+    with open(path, "w") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f)
+
+
+def write_parquet(frame, path):
+    try:
+        frame.to_parquet(path, index=False)
+    except ImportError as e:
+        # parquet needs pyarrow or fastparquet; the other formats do not
+        print(f"skip parquet export: {str(e).splitlines()[0]}")
+        return False
+    return True
+
+
+def write_image(frame, path, dpi=300):
+    # Agg canvas without pyplot, so this is safe off the Tk thread
+    fig = Figure(figsize=(12, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    seedlings = frame[frame["kind"] == "seedling"]
+    status = seedlings["status"].replace("", "Normal")
+    for name in ["Normal", "Root Exposed", "Buried", "Overlap"]:
+        points = seedlings[status == name]
+        if len(points):
+            ax.scatter(points["longitude"], points["latitude"], c=COLORS[name], marker="o", s=100, label=name)
+    missing = frame[frame["kind"] == "missing"]
+    if len(missing):
+        ax.scatter(missing["longitude"], missing["latitude"], facecolors='none', edgecolors='purple',
+                   linewidth=2, s=150, marker="o", label="Missing")
+    if len(frame):
+        ax.legend(loc='best')
+    ax.set_xlabel("Longitude")
+    ax.set_ylabel("Latitude")
+    ax.set_title("Planting Status Distribution")
+    fig.savefig(path, dpi=dpi, bbox_inches='tight')
+
+
+def export_field(table, missed_points, basename=None, formats=FORMATS, progress=None, dpi=300):
+    # returns the written paths; progress(done, total, message) is called after each step
+    if basename is None:
+        basename = f"planting_status_{time.strftime('%Y%m%d_%H%M%S')}"
+    frame = field_frame(table, missed_points)
+    writers = {
+        "geojson": lambda path: write_geojson(frame, path),
+        "csv": lambda path: frame.to_csv(path, index=False),
+        "parquet": lambda path: write_parquet(frame, path),
+        "png": lambda path: write_image(frame, path, dpi)
+    }
+    paths = []
+    for done, fmt in enumerate(formats, 1):
+        path = f"{basename}.{fmt}"
+        written = writers[fmt](path) is not False
+        if written:
+            paths.append(path)
+        if progress:
+            progress(done, len(formats), path if written else f"{path} (skipped)")
+    return paths
+
+
+def start_export(table, missed_points, basename=None, formats=FORMATS, progress=None, dpi=300):
+    # non-daemon thread so the process waits for the files; table should be a copy
+    thread = threading.Thread(target=export_field, args=(table, missed_points, basename, formats, progress, dpi))
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    import argparse
+    from planting_status import RowClassifier, process_csv, process_store
+    from record_store import RecordStore
+
+    parser = argparse.ArgumentParser(description="export a classified field")
+    parser.add_argument("file", help="crossing_records.db or an enriched crossing_records CSV")
+    parser.add_argument("--output", default=None, help="output base name")
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), choices=FORMATS)
+    parser.add_argument("--spacing", type=float, default=0.5)
+    parser.add_argument("--dpi", type=int, default=300)
+    args = parser.parse_args()
+
+    if args.file.endswith(".db"):
+        store = RecordStore(args.file)
+        seedlings = process_store(store)
+        store.close()
+    else:
+        seedlings = process_csv(args.file)
+    classifier = RowClassifier(args.spacing)
+    classifier.add_many(seedlings)
+    export_field(classifier.table, classifier.missed_points, args.output, args.formats,
+                 lambda done, total, path: print(f"[{done}/{total}] {path}"), args.dpi)
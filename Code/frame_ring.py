@@ -0,0 +1,210 @@
+import os
+import sys
+import time
+import subprocess
+from multiprocessing import shared_memory
+import numpy as np
+import cv2
+
+# Shared-memory ring of decoded, resized frames between a capture process and
+# the detector process. One producer and one consumer: the producer fills slot
+# seq % slots and publishes write_seq, the consumer reads frames in sequence
+# order as NumPy views into the shared block and advances read_seq when a slot
+# can be reused. Nothing is pickled; the header holds the counters and the
+# sampling interval the consumer asks for.
+HEADER_FIELDS = ("write_seq", "read_seq", "interval", "done", "slots", "height", "width", "channels")
+WRITE_SEQ, READ_SEQ, INTERVAL, DONE, SLOTS, HEIGHT, WIDTH, CHANNELS = range(len(HEADER_FIELDS))
+HEADER_BYTES = 64
+POLL_INTERVAL = 0.0005
+
+
+def fixed_skip(frame_count, frame_interval):
+    # frames to pass over so the next one read has an index divisible by frame_interval
+    skip = (frame_interval - frame_count % frame_interval) % frame_interval
+    if skip == 0:
+        skip = frame_interval
+    return skip - 1
+
+
+def read_sampled_frame(cap, frame_count, skip, sample_mode):
+    # Advance past `skip` frames without converting them, then decode one;
+    # returns (frame_count, ret, frame).
+    if sample_mode == "seek" and skip > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count + skip)
+        frame_count += skip
+    else:
+        for _ in range(skip):
+            frame_count += 1
+            if sample_mode == "read":
+                ok, _ = cap.read()
+            else:
+                ok = cap.grab()
+            if not ok:
+                return frame_count, False, None
+    frame_count += 1
+    ret, frame = cap.read()
+    return frame_count, ret, frame
+
+
+def ring_size(slots, shape):
+    meta = slots * 3 * 8
+    frame_bytes = int(np.prod(shape))
+    return HEADER_BYTES + meta, frame_bytes, HEADER_BYTES + meta + slots * frame_bytes
+
+
+class FrameRing:
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray(len(HEADER_FIELDS), np.int64, shm.buf)
+        slots = int(self.header[SLOTS])
+        self.shape = (int(self.header[HEIGHT]), int(self.header[WIDTH]), int(self.header[CHANNELS]))
+        frames_offset, frame_bytes, _ = ring_size(slots, self.shape)
+        self.slots = slots
+        self.slot_seq = np.ndarray(slots, np.int64, shm.buf, HEADER_BYTES)
+        self.slot_frame = np.ndarray(slots, np.int64, shm.buf, HEADER_BYTES + slots * 8)
+        self.slot_time = np.ndarray(slots, np.float64, shm.buf, HEADER_BYTES + slots * 16)
+        self.frames = np.ndarray((slots,) + self.shape, np.uint8, shm.buf, frames_offset)
+        self.next_seq = 0
+        self.waits = 0
+
+    @classmethod
+    def create(cls, slots, shape, interval=1):
+        _, _, size = ring_size(slots, shape)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        header = np.ndarray(len(HEADER_FIELDS), np.int64, shm.buf)
+        header[:] = (0, 0, interval, 0, slots, shape[0], shape[1], shape[2])
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            # before 3.13 the resource tracker unlinks attached blocks at exit; the owner does that
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    # producer side
+
+    def acquire(self, stopped=None):
+        # writable view of the next free slot; waits while the consumer holds every slot
+        while self.header[WRITE_SEQ] - self.header[READ_SEQ] >= self.slots:
+            if stopped is not None and stopped():
+                return None
+            self.waits += 1
+            time.sleep(POLL_INTERVAL)
+        return self.frames[self.header[WRITE_SEQ] % self.slots]
+
+    def publish(self, frame_count, capture_time):
+        seq = int(self.header[WRITE_SEQ])
+        slot = seq % self.slots
+        self.slot_seq[slot] = seq
+        self.slot_frame[slot] = frame_count
+        self.slot_time[slot] = capture_time
+        self.header[WRITE_SEQ] = seq + 1
+
+    def finish(self):
+        self.header[DONE] = 1
+
+    def interval(self):
+        return int(self.header[INTERVAL])
+
+    # consumer side
+
+    def set_interval(self, interval):
+        self.header[INTERVAL] = interval
+
+    def get(self, stopped=None):
+        # (frame_count, view, capture time) of the next frame in order, None at the end;
+        # the view stays valid until release()
+        while self.header[WRITE_SEQ] <= self.next_seq:
+            if self.header[DONE] and self.header[WRITE_SEQ] <= self.next_seq:
+                return None
+            if stopped is not None and stopped():
+                return None
+            self.waits += 1
+            time.sleep(POLL_INTERVAL)
+        slot = self.next_seq % self.slots
+        if self.slot_seq[slot] != self.next_seq:
+            raise RuntimeError(f"frame ring out of order: slot {slot} holds {self.slot_seq[slot]}, "
+                               f"expected {self.next_seq}")
+        self.next_seq += 1
+        return int(self.slot_frame[slot]), self.frames[slot], float(self.slot_time[slot])
+
+    def release(self):
+        # the oldest frame handed out by get() is no longer used
+        self.header[READ_SEQ] += 1
+
+    def close(self):
+        # views must be dropped before the mapping can close
+        self.header = self.slot_seq = self.slot_frame = self.slot_time = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # a caller still holds a view; the mapping goes away with the process
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+
+def start_capture_process(ring, input_path, sample_mode="grab", adaptive=False):
+    # separate interpreter, so decode and resize do not share a GIL with inference
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frame_ring.py")
+    command = [sys.executable, script, ring.name, input_path, "--sample-mode", sample_mode]
+    if adaptive:
+        command.append("--adaptive")
+    return subprocess.Popen(command)
+
+
+def capture_to_ring(ring, input_path, sample_mode="grab", adaptive=False):
+    # decode sampled frames and resize them straight into ring slots
+    cap = cv2.VideoCapture(input_path)
+    height, width = ring.shape[:2]
+    frame_count = 0
+    written = 0
+    # a detector that dies without terminating us re-parents this process; stop rather than spin.
+    # Windows keeps the original parent id, there the detector's cleanup is what stops capture
+    parent = os.getppid()
+    stopped = lambda: os.getppid() != parent
+    try:
+        while cap.isOpened() and not stopped():
+            interval = max(1, ring.interval())
+            skip = interval - 1 if adaptive else fixed_skip(frame_count, interval)
+            frame_count, ret, frame = read_sampled_frame(cap, frame_count, skip, sample_mode)
+            if not ret:
+                break
+            slot = ring.acquire(stopped)
+            if slot is None:
+                break
+            cv2.resize(frame, (width, height), dst=slot)
+            ring.publish(frame_count, time.time())
+            written += 1
+    finally:
+        ring.finish()
+        cap.release()
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="capture process feeding a shared-memory frame ring")
+    parser.add_argument("name", help="shared memory block created by the detector process")
+    parser.add_argument("input")
+    parser.add_argument("--sample-mode", choices=["grab", "seek", "read"], default="grab")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="read the next frame interval frames on instead of aligning to multiples of it")
+    args = parser.parse_args()
+
+    ring = FrameRing.attach(args.name)
+    start = time.time()
+    written = capture_to_ring(ring, args.input, args.sample_mode, args.adaptive)
+    print(f"Capture process: {written} frames in {time.time() - start:.1f}s, "
+          f"{ring.waits} waits for a free slot")
+    ring.close()
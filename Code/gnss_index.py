@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+
+
+def parse_datetimes(values):
+    try:
+        return pd.to_datetime(values, format="ISO8601")
+    except ValueError:
+        return pd.to_datetime(values, format="mixed")
+
+
+def to_epoch_ns(values):
+    # naive timestamps are taken as UTC so frame and GNSS clocks compare directly
+    times = pd.Series(values)
+    if not pd.api.types.is_datetime64_any_dtype(times):
+        times = parse_datetimes(times)
+    if times.dt.tz is not None:
+        times = times.dt.tz_convert("UTC").dt.tz_localize(None)
+    return times.to_numpy().astype("datetime64[ns]").astype(np.int64)
+
+
+def timestamp_to_ns(timestamp):
+    ts = pd.Timestamp(timestamp.replace('Z', '+00:00') if isinstance(timestamp, str) else timestamp)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return ts.as_unit("ns").value
+
+
+def offset_position(lat, lon, course, offset_m):
+    # shift fixes offset_m metres to the right of the direction of travel (negative is left),
+    # e.g. from the antenna to a camera over another planting row
+    heading = np.radians(np.asarray(course, dtype=np.float64) + 90.0)
+    lat = np.asarray(lat, dtype=np.float64)
+    north = offset_m * np.cos(heading)
+    east = offset_m * np.sin(heading)
+    return lat + north / 111000, np.asarray(lon, dtype=np.float64) + east / (111000 * np.cos(np.radians(lat)))
+
+
+class GNSSIndex:
+    def __init__(self, timestamps_df, gps_df):
+        frames = timestamps_df["frame_number"].to_numpy(dtype=np.int64)
+        order = np.argsort(frames, kind="stable")
+        self.frames = frames[order]
+        self.frame_times = to_epoch_ns(timestamps_df["timestamp"])[order]
+        self.frame_timestamps = timestamps_df["timestamp"].to_numpy(dtype=object)[order]
+
+        gps_datetimes = parse_datetimes(gps_df["datetime"])
+        self.gps_tz = gps_datetimes.dt.tz
+        gps_times = to_epoch_ns(gps_datetimes)
+        order = np.argsort(gps_times, kind="stable")
+        self.gps_times = gps_times[order]
+        self.latitude = gps_df["latitude"].to_numpy(dtype=np.float64)[order]
+        self.longitude = gps_df["longitude"].to_numpy(dtype=np.float64)[order]
+        self.speed = gps_df["speed"].to_numpy(dtype=np.float64)[order]
+        self.course = gps_df["course"].to_numpy(dtype=np.float64)[order]
+
+    @classmethod
+    def from_csv(cls, timestamps_path="frames_timestamps.csv", gnss_path="GNSS.csv"):
+        return cls(pd.read_csv(timestamps_path), pd.read_csv(gnss_path))
+
+    def frame_positions(self, frame_numbers):
+        # index into self.frames for each frame, -1 where the frame has no timestamp
+        frame_numbers = np.asarray(frame_numbers, dtype=np.int64)
+        if len(self.frames) == 0:
+            return np.full(len(frame_numbers), -1, dtype=np.int64)
+        pos = np.searchsorted(self.frames, frame_numbers)
+        pos_clipped = np.minimum(pos, len(self.frames) - 1)
+        found = (pos < len(self.frames)) & (self.frames[pos_clipped] == frame_numbers)
+        return np.where(found, pos_clipped, -1)
+
+    def nearest_fix(self, times_ns):
+        times_ns = np.asarray(times_ns, dtype=np.int64)
+        right = np.searchsorted(self.gps_times, times_ns)
+        right_clipped = np.minimum(right, len(self.gps_times) - 1)
+        left = np.maximum(right - 1, 0)
+        take_left = (right == len(self.gps_times)) | (
+            (right > 0) & (times_ns - self.gps_times[left] <= self.gps_times[right_clipped] - times_ns))
+        return np.where(take_left, left, right_clipped)
+
+    def interpolate(self, times_ns):
+        # linear interpolation between the bracketing fixes, held at the ends of the log
+        times_ns = np.asarray(times_ns, dtype=np.int64)
+        if len(self.gps_times) > 1:
+            right = np.clip(np.searchsorted(self.gps_times, times_ns, side="right"), 1, len(self.gps_times) - 1)
+        else:
+            right = np.ones(len(times_ns), dtype=np.int64)
+        left = right - 1
+        if len(self.gps_times) == 1:
+            right = left = np.zeros(len(times_ns), dtype=np.int64)
+        t0 = self.gps_times[left]
+        span = self.gps_times[right] - t0
+        w = np.divide(times_ns - t0, span, out=np.zeros(len(times_ns)), where=span > 0)
+        w = np.clip(w, 0.0, 1.0)
+
+        # course is interpolated along the shorter arc so 359 -> 1 passes through 0
+        c0 = self.course[left]
+        turn = (self.course[right] - c0 + 180.0) % 360.0 - 180.0
+        return {
+            'latitude': self.latitude[left] + w * (self.latitude[right] - self.latitude[left]),
+            'longitude': self.longitude[left] + w * (self.longitude[right] - self.longitude[left]),
+            'speed': self.speed[left] + w * (self.speed[right] - self.speed[left]),
+            'course': (c0 + w * turn) % 360.0,
+        }
+
+    def interpolate_frames(self, frame_numbers):
+        # batched frame -> interpolated position; NaN where the frame has no timestamp
+        pos = self.frame_positions(frame_numbers)
+        found = pos >= 0
+        if len(self.gps_times) == 0 or len(self.frames) == 0:
+            nan = np.full(len(pos), np.nan)
+            return {'found': np.zeros(len(pos), dtype=bool), 'position': pos,
+                    'frame_time': np.zeros(len(pos), dtype=np.int64),
+                    'latitude': nan, 'longitude': nan.copy(), 'speed': nan.copy(), 'course': nan.copy()}
+        times = np.where(found, self.frame_times[np.maximum(pos, 0)], 0)
+        result = self.interpolate(times)
+        for key in list(result):
+            result[key] = np.where(found, result[key], np.nan)
+        result['found'] = found
+        result['position'] = pos
+        result['frame_time'] = times
+        return result
+
+    def resolve_times(self, times_ns, interpolate=True):
+        # batched capture time -> position, for frames no timestamp file covers (live cameras)
+        times_ns = np.asarray(times_ns, dtype=np.int64)
+        fix = np.full(len(times_ns), -1, dtype=np.int64)
+        if len(self.gps_times) == 0:
+            nan = np.full(len(times_ns), np.nan)
+            return {'found': np.zeros(len(times_ns), dtype=bool), 'fix': fix, 'frame_time': times_ns,
+                    'latitude': nan, 'longitude': nan.copy(), 'speed': nan.copy(), 'course': nan.copy()}
+        if interpolate:
+            result = self.interpolate(times_ns)
+        else:
+            fix = self.nearest_fix(times_ns)
+            result = {'latitude': self.latitude[fix], 'longitude': self.longitude[fix],
+                      'speed': self.speed[fix], 'course': self.course[fix]}
+        result['found'] = np.ones(len(times_ns), dtype=bool)
+        result['fix'] = fix
+        result['frame_time'] = times_ns
+        return result
+
+    def time_iso(self, time_ns):
+        ts = pd.Timestamp(int(time_ns), unit="ns")
+        if self.gps_tz is not None:
+            ts = ts.tz_localize("UTC").tz_convert(self.gps_tz)
+        return ts.isoformat()
+
+    def fix_time_iso(self, index):
+        return self.time_iso(self.gps_times[index])
+
+    def timestamp_for_frame(self, frame_number):
+        pos = self.frame_positions([int(frame_number)])[0]
+        return None if pos < 0 else self.frame_timestamps[pos]
+
+    def gps_for_time(self, time_ns):
+        if len(self.gps_times) == 0:
+            return None
+        j = int(self.nearest_fix([time_ns])[0])
+        return {
+            'latitude': float(self.latitude[j]),
+            'longitude': float(self.longitude[j]),
+            'speed': float(self.speed[j]),
+            'course': float(self.course[j]),
+            'timestamp': self.fix_time_iso(j)
+        }
+
+    def gps_for_frame(self, frame_number):
+        pos = self.frame_positions([int(frame_number)])[0]
+        if pos < 0:
+            return None
+        return self.gps_for_time(self.frame_times[pos])
+
+    def resolve_frames(self, frame_numbers):
+        # batched frame -> nearest GNSS fix; rows with found == False have no timestamp
+        pos = self.frame_positions(frame_numbers)
+        found = pos >= 0
+        fix = np.full(len(pos), -1, dtype=np.int64)
+        if len(self.gps_times) == 0 or len(self.frames) == 0:
+            nan = np.full(len(pos), np.nan)
+            return {'found': np.zeros(len(pos), dtype=bool), 'fix': fix, 'frame_time': np.zeros(len(pos), dtype=np.int64),
+                    'latitude': nan, 'longitude': nan.copy(), 'speed': nan.copy(), 'course': nan.copy()}
+        fix[found] = self.nearest_fix(self.frame_times[pos[found]])
+        return {
+            'found': found,
+            'fix': fix,
+            'frame_time': np.where(found, self.frame_times[np.maximum(pos, 0)], 0),
+            'latitude': np.where(found, self.latitude[np.maximum(fix, 0)], np.nan),
+            'longitude': np.where(found, self.longitude[np.maximum(fix, 0)], np.nan),
+            'speed': np.where(found, self.speed[np.maximum(fix, 0)], np.nan),
+            'course': np.where(found, self.course[np.maximum(fix, 0)], np.nan),
+        }
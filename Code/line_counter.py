@@ -0,0 +1,88 @@
+import numpy as np
+
+
+# Crossing engine over a compact track table kept sorted by track id. A
+# track is armed while its centre is before the line and is counted once when
+# it passes it; after that it re-arms only when it moves back more than
+# hysteresis pixels, so a box jittering on the line is not counted twice.
+# Tracks not seen for max_age processed frames are evicted, so the table never
+# holds more than the tracks of the last few seconds.
+class LineCounter:
+    def __init__(self, line_x, right_to_left=True, hysteresis=4, max_age=30):
+        self.line_x = line_x
+        self.right_to_left = right_to_left
+        self.hysteresis = hysteresis
+        self.max_age = max_age
+        self.next_id = 1
+        self.class_counters = {}
+        self.frame_centers = np.empty(0)
+        self.updates = 0
+        self.track_ids = np.empty(0, dtype=np.int64)
+        self.continuous_ids = np.empty(0, dtype=np.int64)
+        self.armed = np.empty(0, dtype=bool)
+        self.last_update = np.empty(0, dtype=np.int64)
+
+    def gaps(self, centers):
+        # pixels still to travel before the line; negative once past it
+        return centers - self.line_x if self.right_to_left else self.line_x - centers
+
+    def near_line(self, margin):
+        # a track in the last frame that is within margin pixels of the line and has yet to cross it
+        gaps = self.gaps(self.frame_centers)
+        return bool(((gaps >= 0) & (gaps <= margin)).any())
+
+    def lookup(self, ids, gaps):
+        # table slot of every id, adding tracks seen for the first time
+        slots = np.searchsorted(self.track_ids, ids)
+        known = slots < len(self.track_ids)
+        known[known] = self.track_ids[slots[known]] == ids[known]
+        if known.all():
+            return slots
+        new_ids, first = np.unique(ids[~known], return_index=True)
+        # continuous ids follow the order the tracks appear in the frame
+        continuous = np.empty(len(new_ids), dtype=np.int64)
+        continuous[np.argsort(first)] = np.arange(self.next_id, self.next_id + len(new_ids))
+        self.next_id += len(new_ids)
+        at = np.searchsorted(self.track_ids, new_ids)
+        self.track_ids = np.insert(self.track_ids, at, new_ids)
+        self.continuous_ids = np.insert(self.continuous_ids, at, continuous)
+        self.armed = np.insert(self.armed, at, gaps[~known][first] >= 0)
+        self.last_update = np.insert(self.last_update, at, self.updates)
+        return np.searchsorted(self.track_ids, ids)
+
+    def evict(self):
+        alive = self.updates - self.last_update <= self.max_age
+        if not alive.all():
+            self.track_ids = self.track_ids[alive]
+            self.continuous_ids = self.continuous_ids[alive]
+            self.armed = self.armed[alive]
+            self.last_update = self.last_update[alive]
+
+    def update(self, boxes, classes, track_ids, names):
+        self.updates += 1
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        classes = np.asarray(classes).astype(np.int64)
+        track_ids = np.asarray(track_ids).astype(np.int64)
+        tracked = np.flatnonzero(track_ids != -1)
+        ids = track_ids[tracked]
+        # centres of the pixel boxes that are drawn
+        centers = np.trunc(boxes[tracked][:, [0, 2]]).sum(axis=1) / 2
+        gaps = self.gaps(centers)
+        self.frame_centers = centers
+
+        slots = self.lookup(ids, gaps)
+        crossed = self.armed[slots] & (gaps < 0)
+        self.armed[slots] = (gaps >= 0) & (self.armed[slots] | (gaps >= self.hysteresis))
+        self.last_update[slots] = self.updates
+
+        continuous = np.full(len(boxes), -1, dtype=np.int64)
+        continuous[tracked] = self.continuous_ids[slots]
+        labels = [names[c] for c in classes.tolist()]
+        frame_ids = list(zip(track_ids.tolist(), continuous.tolist(), labels))
+        crossings = []
+        for i in tracked[crossed].tolist():
+            label = labels[i]
+            self.class_counters[label] = self.class_counters.get(label, 0) + 1
+            crossings.append((int(continuous[i]), int(track_ids[i]), label))
+        self.evict()
+        return crossings, frame_ids
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import deque
+import cv2
+import numpy as np
+
+
+def is_live_source(source):
+    # camera index or stream URL; anything else is a file
+    return str(source).isdigit() or "://" in str(source)
+
+
+def open_source(source):
+    return cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+
+
+# Reads the source on its own thread and keeps only the newest frame, so the
+# detector always gets the freshest image instead of a backlog. Frames the
+# sampling interval asked for but that were overwritten before inference got to
+# them count as dropped. While hold() is on (a track is close to the counting
+# line) sampled frames are queued instead, up to max_hold, so the tracker sees
+# consecutive frames exactly when a crossing could otherwise be missed. Files
+# are paced at their native frame rate to stand in for a camera.
+class LatestFrameGrabber:
+    def __init__(self, source, max_hold=4, pace=None):
+        self.source = source
+        self.cap = open_source(source)
+        self.pace = not is_live_source(source) if pace is None else pace
+        self.max_hold = max_hold
+        self.interval = 1
+        self.cond = threading.Condition()
+        self.latest = None  # (index, frame, capture time)
+        self.held = deque()
+        self.holding = False
+        self.finished = False
+        self.running = False
+        self.thread = None
+
+        self.captured = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.held_frames = 0
+        self.hold_overflow = 0
+        self.last_delivered = 0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        if fps <= 0 or fps > 120:
+            fps = 30.0
+        start = time.time()
+        index = 0
+        while self.running:
+            ok, frame = self.cap.read()
+            if not ok:
+                break
+            index += 1
+            if self.pace:
+                delay = start + index / fps - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            item = (index, frame, time.time())
+            with self.cond:
+                self.captured += 1
+                if self.holding:
+                    last = self.held[-1][0] if self.held else self.last_delivered
+                    if index >= last + self.interval:
+                        if len(self.held) >= self.max_hold:
+                            self.held.popleft()
+                            self.hold_overflow += 1
+                        self.held.append(item)
+                        self.held_frames += 1
+                self.latest = item
+                self.cond.notify_all()
+        with self.cond:
+            self.finished = True
+            self.cond.notify_all()
+
+    def hold(self, holding):
+        with self.cond:
+            self.holding = holding
+
+    def read(self, min_index=0):
+        # next frame to process: a held frame first, else the newest one at or past min_index;
+        # None once the source has ended and nothing newer is left
+        with self.cond:
+            while True:
+                if self.held:
+                    item = self.held.popleft()
+                    break
+                if self.latest is not None and self.latest[0] >= max(min_index, self.last_delivered + 1):
+                    item = self.latest
+                    break
+                if self.finished or not self.running:
+                    return None
+                self.cond.wait(0.1)
+            if self.last_delivered:
+                self.dropped += max(0, (item[0] - self.last_delivered) // self.interval - 1)
+            self.last_delivered = item[0]
+            self.delivered += 1
+            return item
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+
+    def stats(self):
+        with self.cond:
+            return {
+                "captured": self.captured,
+                "processed": self.delivered,
+                "dropped": self.dropped,
+                "held": self.held_frames,
+                "hold_overflow": self.hold_overflow
+            }
+
+
+class LatencyStats:
+    def __init__(self, window=1000):
+        self.recent = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.recent.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def summary(self):
+        if not self.count:
+            return {"mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        return {
+            "mean_ms": 1000 * self.total / self.count,
+            "p95_ms": 1000 * float(np.percentile(self.recent, 95)),
+            "max_ms": 1000 * self.max
+        }
@@ -1,32 +1,70 @@
-import subprocess
-import time
-import csv
+import argparse
 import pandas as pd
-from datetime import datetime
-import os
 import threading
-from queue import Queue
-import hashlib
-import detection 
+from queue import Queue, Empty
+from concurrent.futures import ThreadPoolExecutor
+import Detection
 import matplotlib.pyplot as plt 
 import unity_communication  
+import event_log
+from gnss_index import GNSSIndex, parse_datetimes, timestamp_to_ns, offset_position
+from record_store import RecordStore
+from event_bus import EventBus
+from orchestrator import Orchestrator, default_rows, load_rows
+from live_source import is_live_source
 
 class RecordProcessor:
-    def __init__(self):
+    def __init__(self, bus=None, rows=None, interpolate_gps=True, workers=4, batch_size=64):
+        # (session id << 56 | frame << 24 | row << 16 | label id) of every record already enriched;
+        # frame numbers restart with each count.py run, so the event-log session is part of the key
         self.processed_records = set()  
+        self.label_ids = {}
+        self.session_ids = {}
         self.lock = threading.Lock()    
         self.queue = Queue()            
-        self.timestamps_df = None
+        # enrichment runs on a worker pool; results are committed in dispatch order
+        self.workers = workers
+        self.batch_size = batch_size
+        self.executor = None
+        self.results = Queue(maxsize=2 * workers)
+        self.threads = []
+        # one camera per planting row, each with its own event log and frame timestamps
+        self.rows = {config['row']: config for config in (rows or default_rows())}
+        # a camera has no timestamp file; its crossings are placed by the capture time they carry
+        self.live_rows = {row for row, config in self.rows.items() if is_live_source(config['input'])}
         self.gps_df = None
+        self.gnss = {}
+        self.interpolate_gps = interpolate_gps
         self.is_running = True
         self.temp_file = 'temp_crossing_records.csv' 
         self.unity_comm = None  
+        # crossings arrive from count.py on the bus; enriched records are published back on it
+        self.bus = bus
+        if bus is not None:
+            bus.subscribe("crossing", self.on_crossing)
+        self.event_readers = {row: event_log.EventLogReader(config['event_log'],
+                                                            offset_path=config['event_log'] + '.offset')
+                              for row, config in self.rows.items()}
+        # (session, log offset) of the last crossing queued per row; the bus drops what count.py
+        # publishes while it is not connected, and those crossings are read back from the log
+        self.crossing_offsets = {}
+        self.log_lock = threading.Lock()
+        # enriched records live in their own keyed store; nothing rewrites a CSV per record
+        self.store = RecordStore('crossing_records.db')
+        for label, frame_number, row, session in self.store.keys():
+            self.processed_records.add(self.record_key(label, frame_number, row, session))
 
     def initialize_data(self):
         print("loading timestamp and GPS data...")
-        self.timestamps_df = pd.read_csv('frames_timestamps.csv')
         self.gps_df = pd.read_csv('GNSS.csv')
-        self.gps_df['datetime'] = pd.to_datetime(self.gps_df['datetime'])
+        self.gps_df['datetime'] = parse_datetimes(self.gps_df['datetime'])
+        # sorted int64 epoch arrays so each lookup is a binary search; one receiver, a frame clock per camera
+        for row, config in self.rows.items():
+            if row in self.live_rows:
+                timestamps = pd.DataFrame({'frame_number': [], 'timestamp': []})
+            else:
+                timestamps = pd.read_csv(config['timestamps'])
+            self.gnss[row] = GNSSIndex(timestamps, self.gps_df)
         print("loading completed！")
 
     def start_unity_server(self):
@@ -35,180 +73,275 @@ class RecordProcessor:
         self.unity_comm.start_server()
         print("waiting for connect...")
 
-    def get_record_hash(self, label, frame_number):
-        record_str = f"{label}_{frame_number}"
-        return hashlib.md5(record_str.encode()).hexdigest()
+    def record_key(self, label, frame_number, row=0, session=0.0):
+        label_id = self.label_ids.setdefault(str(label), len(self.label_ids))
+        session_id = self.session_ids.setdefault(float(session), len(self.session_ids))
+        frame = int(frame_number) if str(frame_number).lstrip('-').isdigit() else -1
+        return session_id << 56 | (frame & 0xFFFFFFFF) << 24 | int(row) << 16 | label_id
 
-    def get_timestamp_for_frame(self, frame_number):
+    def get_timestamp_for_frame(self, frame_number, row=0):
         try:
-            row = self.timestamps_df[self.timestamps_df['frame_number'] == int(frame_number)].iloc[0]
-            return row['timestamp']
-        except (IndexError, KeyError):
+            return self.gnss[row].timestamp_for_frame(int(frame_number))
+        except (ValueError, TypeError):
             return None
 
     def get_gps_for_timestamp(self, timestamp):
         try:
-            timestamp_dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            closest_row = self.gps_df.iloc[(self.gps_df['datetime'] - timestamp_dt).abs().argsort()[:1]]
-            
-            return {
-                'latitude': float(closest_row['latitude'].iloc[0]),
-                'longitude': float(closest_row['longitude'].iloc[0]),
-                'speed': float(closest_row['speed'].iloc[0]),
-                'course': float(closest_row['course'].iloc[0]),
-                'timestamp': closest_row['datetime'].iloc[0].isoformat()
-            }
+            # every row's index holds the same GNSS log
+            return next(iter(self.gnss.values())).gps_for_time(timestamp_to_ns(timestamp))
         except Exception as e:
             print(f"Error getting GPS data: {e}")
             return None
 
-    def update_record_with_gps(self, label, frame_number):
-        timestamp = self.get_timestamp_for_frame(frame_number)
-        if timestamp:
-            gps_data = self.get_gps_for_timestamp(timestamp)
-            if gps_data:
-                return [str(label), str(frame_number), str(gps_data['timestamp']), 
-                       str(gps_data['latitude']), str(gps_data['longitude']), 
-                       str(gps_data['speed']), str(gps_data['course'])]
-        return None
-
-    def process_record(self, label, frame_number):
+    def format_record(self, label, frame_number, gps_data, row=0, session=0.0):
+        # typed values; the store and the dashboard keep them as numbers, not strings
+        return [str(label), int(frame_number), str(gps_data['timestamp']), 
+               float(gps_data['latitude']), float(gps_data['longitude']), 
+               float(gps_data['speed']), float(gps_data['course']), int(row), float(session)]
+
+    def update_record_with_gps(self, label, frame_number, row=0, session=0.0, capture_time=0.0):
+        return self.update_records_with_gps([label], [frame_number], [row], [session], [capture_time])[0]
+
+    def update_records_with_gps(self, labels, frame_numbers, rows=None, sessions=None, capture_times=None):
+        # batched lookup, one batch per planting row; None where a frame has no timestamp
+        rows = [0] * len(labels) if rows is None else [int(row) for row in rows]
+        sessions = [0.0] * len(labels) if sessions is None else sessions
+        capture_times = [0.0] * len(labels) if capture_times is None else capture_times
+        records = [None] * len(labels)
+        for row in set(rows):
+            indices = [i for i, r in enumerate(rows) if r == row]
+            enriched = self.enrich_row(row, [labels[i] for i in indices], [frame_numbers[i] for i in indices],
+                                       [sessions[i] for i in indices], [capture_times[i] for i in indices])
+            for i, record in zip(indices, enriched):
+                records[i] = record
+        return records
+
+    def enrich_row(self, row, labels, frame_numbers, sessions, capture_times):
+        gnss = self.gnss[row]
+        frames = [int(f) if str(f).lstrip('-').isdigit() else -1 for f in frame_numbers]
+        live = row in self.live_rows
+        if live:
+            # capture times are epoch seconds from count.py's clock, kept to the microsecond
+            resolved = gnss.resolve_times([round(t * 1e6) * 1000 for t in capture_times], self.interpolate_gps)
+        elif self.interpolate_gps:
+            # position at the frame's own time, between the bracketing GNSS fixes
+            resolved = gnss.interpolate_frames(frames)
+        else:
+            resolved = gnss.resolve_frames(frames)
+        latitude, longitude = resolved['latitude'], resolved['longitude']
+        offset_m = self.rows[row].get('offset_m', 0.0)
+        if offset_m:
+            latitude, longitude = offset_position(latitude, longitude, resolved['course'], offset_m)
+        records = []
+        for i, (label, frame_number, session) in enumerate(zip(labels, frame_numbers, sessions)):
+            if not resolved['found'][i]:
+                records.append(None)
+                continue
+            if self.interpolate_gps:
+                if live:
+                    timestamp = gnss.time_iso(resolved['frame_time'][i])
+                else:
+                    timestamp = gnss.frame_timestamps[resolved['position'][i]]
+            else:
+                timestamp = gnss.fix_time_iso(resolved['fix'][i])
+            records.append(self.format_record(label, frame_number, {
+                'latitude': float(latitude[i]),
+                'longitude': float(longitude[i]),
+                'speed': float(resolved['speed'][i]),
+                'course': float(resolved['course'][i]),
+                'timestamp': timestamp
+            }, row, session))
+        return records
+
+    def process_record(self, label, frame_number, row=0, session=0.0, capture_time=0.0):
+        # synchronous path for a single record; the queue goes through the worker pool
         try:
-            record_hash = self.get_record_hash(str(label), str(frame_number))
-     
+            key = self.record_key(label, frame_number, row, session)
             with self.lock:
-                if record_hash in self.processed_records:
+                if key in self.processed_records:
                     return
-                self.processed_records.add(record_hash)
+                self.processed_records.add(key)
               
-            updated_record = self.update_record_with_gps(label, frame_number)
+            updated_record = self.update_record_with_gps(label, frame_number, row, session, capture_time)
             if updated_record:
-                all_records = []
-                header = ['Label', 'Frame_Number', 'Timestamp', 'Latitude', 'Longitude', 'Speed', 'Course']
-
-                if os.path.exists('crossing_records.csv'):
-                    with open('crossing_records.csv', 'r', newline='') as f:
-                        reader = csv.reader(f)
-                        file_header = next(reader)  
-
-                        if len(file_header) <= 2: 
-                            all_records = [] 
-                        else:
-                            header = file_header  
-                            all_records = list(reader)
-
-                record_updated = False
-                for i, record in enumerate(all_records):
-                    if len(record) >= 2 and str(record[0]) == str(label) and str(record[1]) == str(frame_number):
-                        all_records[i] = updated_record
-                        record_updated = True
-                        break
-
-                if not record_updated:
-                    all_records.append(updated_record)
-
-                with open('crossing_records.csv', 'w', newline='') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(header)
-                    writer.writerows(all_records)
-
-                print(f"\n refresh：")
-                print(f"label: {label}")
-                print(f"frame_number: {frame_number}")
-                print(f"timestamp: {updated_record[2]}")
-                print(f"location: lat={updated_record[3]}, lon={updated_record[4]}")
-                print(f"speed: {updated_record[5]} m/s")
-                print(f"direction: {updated_record[6]}°")
-
-                if self.unity_comm and self.unity_comm.is_connected():
-                    state_mapping = {
-                        'Seedling': 'Normal_Transplant',
-                        'Root': 'Root_Exposure',
-                        'Buried Seedling': 'Buried_Seedling'
-                    }
-                    state = state_mapping.get(label, label)
-                    
-                    self.unity_comm.send_gps_data(
-                        lat=float(updated_record[3]),
-                        lon=float(updated_record[4]),
-                        state=state
-                    )
-                    print(f"send imformation=({updated_record[3]}, {updated_record[4]}), 状态={state}")
+                seq = self.store.upsert(updated_record)
+                self.publish_record(updated_record, seq)
         except Exception as e:
             print(f"Error processing record: {e}")
 
-    def monitor_file(self):
-        last_position = 0
-        
-        while self.is_running:
-            try:
-                if os.path.exists('crossing_records.csv'):
-                    with open('crossing_records.csv', 'r') as f:
-                        f.seek(last_position)
-                        reader = csv.reader(f)
-                        if last_position == 0:
-                            next(reader)  
-                        
-                        for row in reader:
-                            if len(row) >= 2:  
-                                try:
-                                    frame_number = int(row[1])
-                                    self.queue.put((str(row[0]), str(frame_number)))
-                                except ValueError:
-                                    print(f" {row[1]}")
-                        
-                        last_position = f.tell()
-                        
-            except Exception as e:
-                print(f"Error monitoring file: {e}")
+    def publish_record(self, updated_record, seq):
+        label = updated_record[0]
+        if self.bus is not None:
+            self.bus.publish("record", (seq, *updated_record))
+
+        print(f"\n refresh：")
+        print(f"row: {updated_record[7]}")
+        print(f"label: {label}")
+        print(f"frame_number: {updated_record[1]}")
+        print(f"timestamp: {updated_record[2]}")
+        print(f"location: lat={updated_record[3]}, lon={updated_record[4]}")
+        print(f"speed: {updated_record[5]} m/s")
+        print(f"direction: {updated_record[6]}°")
+
+        if self.unity_comm and self.unity_comm.is_connected():
+            state_mapping = {
+                'Seedling': 'Normal_Transplant',
+                'Root': 'Root_Exposure',
+                'Buried Seedling': 'Buried_Seedling'
+            }
+            state = state_mapping.get(label, label)
             
-            time.sleep(0.1) 
+            self.unity_comm.send_gps_data(
+                lat=float(updated_record[3]),
+                lon=float(updated_record[4]),
+                state=state
+            )
+            print(f"send imformation=({updated_record[3]}, {updated_record[4]}), 状态={state}")
+
+    def on_crossing(self, message):
+        session, event = message
+        row = event.row
+        with self.log_lock:
+            last = self.crossing_offsets.get(row)
+            if last is not None and last[0] == session:
+                if event.offset <= last[1]:
+                    # already read from the log
+                    return
+                if event.offset == last[1] + event_log.RECORD.size:
+                    self.crossing_offsets[row] = (session, event.offset)
+                    self.queue.put((event.label, str(event.frame), event.offset, session, row, event.time))
+                    return
+            # a new session, or crossings missed while count.py was not connected: the log has
+            # them, in order, up to this one
+            reader = self.event_readers.get(row)
+            if reader is not None:
+                reader.seek(session, last[1] if last is not None and last[0] == session else 0)
+                self.queue_logged(row, reader)
+            last = self.crossing_offsets.get(row)
+            if last is None or last[0] != session or event.offset > last[1]:
+                # not in the log yet (buffered writes); the next crossing reads on from the last one
+                self.queue.put((event.label, str(event.frame), event.offset, session, row, event.time))
+
+    def queue_logged(self, row, reader):
+        # called with self.log_lock held
+        for event in reader.read_new():
+            self.queue.put((event.label, str(event.frame), event.offset, reader.session, row, event.time))
+        if reader.session is not None:
+            self.crossing_offsets[row] = (reader.session, reader.offset)
+
+    def catch_up(self):
+        # crossings logged while nothing was listening (e.g. the end of a previous run)
+        with self.log_lock:
+            for row, reader in self.event_readers.items():
+                self.queue_logged(row, reader)
+
+    def start_workers(self):
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="enrich")
+        self.threads = [threading.Thread(target=self.process_queue, daemon=True),
+                        threading.Thread(target=self.commit_results, daemon=True)]
+        for thread in self.threads:
+            thread.start()
 
     def process_queue(self):
+        # dedupe and batch in arrival (frame) order, then hand the lookups to the pool;
+        # the bounded results queue is the reorder buffer and holds dispatch back when full
         while self.is_running:
             try:
-                label, frame_number = self.queue.get(timeout=1)
-                self.process_record(label, frame_number)
-                self.queue.task_done()
-            except:
+                items = [self.queue.get(timeout=1)]
+            except Empty:
+                continue
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            fresh = []
+            for label, frame_number, _, session, row, _ in items:
+                key = self.record_key(label, frame_number, row, session)
+                with self.lock:
+                    new = key not in self.processed_records
+                    self.processed_records.add(key)
+                fresh.append(new)
+            labels = [item[0] for item, new in zip(items, fresh) if new]
+            frames = [item[1] for item, new in zip(items, fresh) if new]
+            rows = [item[4] for item, new in zip(items, fresh) if new]
+            sessions = [item[3] for item, new in zip(items, fresh) if new]
+            capture_times = [item[5] for item, new in zip(items, fresh) if new]
+            future = self.executor.submit(self.update_records_with_gps, labels, frames, rows, sessions,
+                                          capture_times)
+            self.results.put((items, fresh, future))
+
+    def commit_results(self):
+        # batches come out in the order they were dispatched, whichever worker finishes first
+        while self.is_running or not self.results.empty():
+            try:
+                items, fresh, future = self.results.get(timeout=1)
+            except Empty:
                 continue
+            try:
+                records = [record for record in future.result() if record]
+                if records:
+                    seqs = self.store.upsert_many(records)
+                    for record, seq in zip(records, seqs):
+                        self.publish_record(record, seq)
+            except Exception as e:
+                print(f"Error processing record: {e}")
+            for _, _, offset, session, row, _ in items:
+                # the stored offset only advances past records that were processed
+                reader = self.event_readers.get(row)
+                if reader is not None:
+                    with self.log_lock:
+                        reader.commit(offset, session=session)
+                self.queue.task_done()
 
     def stop(self):
         self.is_running = False
+        for thread in self.threads:
+            thread.join(timeout=5)
+        if self.executor is not None:
+            self.executor.shutdown()
+        for reader in self.event_readers.values():
+            reader.close()
+        self.store.export_csv('crossing_records.csv')
+        self.store.close()
         if self.unity_comm:
             self.unity_comm.stop_server()
             print("Unity communication stop")
 
-def run_detection():
-    process = subprocess.Popen(['python', 'count.py'])
-    return process
-
 def main():
-    processor = RecordProcessor()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", default=None,
+                        help="JSON file with one entry per camera/planting row; default is the single camera setup")
+    parser.add_argument("--report-interval", type=float, default=10.0,
+                        help="seconds between per-worker throughput reports (0 disables them)")
+    args = parser.parse_args()
+    rows = load_rows(args.rows) if args.rows else default_rows()
+
+    bus = EventBus().start()
+    processor = RecordProcessor(bus, rows)
     processor.initialize_data()
     
     processor.start_unity_server()
     
-    app = state_recognition.start_state_monitoring()
+    app = Detection.start_state_monitoring(unity_comm=processor.unity_comm, bus=bus)
     
+    detection = Orchestrator(rows, bus, args.report_interval)
     try:
-        monitor_thread = threading.Thread(target=processor.monitor_file)
-        monitor_thread.daemon = True
-        monitor_thread.start()
+        processor.catch_up()
         
-        process_thread = threading.Thread(target=processor.process_queue)
-        process_thread.daemon = True
-        process_thread.start()
+        processor.start_workers()
         
-        detection_process = run_detection()
+        detection.start()
         
         app.root.mainloop()
         
     except KeyboardInterrupt:
+        pass
     finally:
+        # workers first, so their last crossings are enriched before the store closes
+        detection.stop()
         processor.stop()
-        if 'detection_process' in locals():
-            detection_process.terminate()
+        bus.close()
 
 if __name__ == "__main__":
     main() 
@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+
+# One count.py worker per camera / planting row. Every worker tags its
+# crossings with its row and publishes them on the shared event bus, so the
+# enricher sees a single merged stream. Workers also publish a "stats" message
+# every few seconds: (row, processed frames, elapsed seconds, crossings,
+# mean end-to-end latency in ms), which is what the throughput report shows.
+DIRECTIONS = ("right_to_left", "left_to_right")
+COUNT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "count.py")
+
+
+def row_config(row, **overrides):
+    # per-row file names, so workers never share an event log, video or timestamp file
+    config = {
+        "row": row,
+        "input": f"row{row}.mp4",
+        "model": "best.pt",
+        "output": f"output_row{row}.mp4",
+        "event_log": f"crossing_events_row{row}.log",
+        "timestamps": f"frames_timestamps_row{row}.csv",
+        "direction": "right_to_left",
+        "cpus": None,
+        "offset_m": 0.0,  # lateral camera offset from the GNSS antenna, positive to the right
+        "args": []
+    }
+    config.update(overrides)
+    if config["direction"] not in DIRECTIONS:
+        raise ValueError(f"row {row}: direction must be one of {DIRECTIONS}")
+    return config
+
+
+def default_rows():
+    # the single-camera setup with its original file names
+    return [row_config(0, input="input.mp4", output="output.mp4", event_log="crossing_events.log",
+                       timestamps="frames_timestamps.csv")]
+
+
+def assign_cpus(rows, cpu_count=None):
+    # rows without an explicit CPU list split the cores nobody claimed
+    cpu_count = cpu_count or os.cpu_count() or 1
+    taken = {cpu for config in rows if config["cpus"] for cpu in config["cpus"]}
+    free = [cpu for cpu in range(cpu_count) if cpu not in taken] or list(range(cpu_count))
+    pending = [config for config in rows if not config["cpus"]]
+    for i, config in enumerate(pending):
+        share = free[i * len(free) // len(pending):(i + 1) * len(free) // len(pending)]
+        config["cpus"] = share or [free[i % len(free)]]
+    return rows
+
+
+def load_rows(path):
+    # {"rows": [{"row": 0, "input": "cam0.mp4", "direction": "left_to_right", "cpus": [0, 1]}, ...]}
+    with open(path) as f:
+        entries = json.load(f)["rows"]
+    rows = [row_config(entry.get("row", i), **{k: v for k, v in entry.items() if k != "row"})
+            for i, entry in enumerate(entries)]
+    ids = [config["row"] for config in rows]
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"duplicate row ids in {path}: {ids}")
+    return assign_cpus(rows)
+
+
+class DetectionWorker:
+    def __init__(self, config, bus):
+        self.config = config
+        self.bus = bus
+        self.process = None
+        self.started = None
+
+    def command(self):
+        config = self.config
+        command = [sys.executable, COUNT_SCRIPT,
+                   "--row", str(config["row"]),
+                   "--input", config["input"],
+                   "--model", config["model"],
+                   "--output", config["output"],
+                   "--event-log", config["event_log"],
+                   "--timestamps", config["timestamps"],
+                   "--direction", config["direction"],
+                   "--bus", self.bus.address]
+        if config["cpus"]:
+            command += ["--cpus", ",".join(str(cpu) for cpu in config["cpus"])]
+        return command + list(config["args"])
+
+    def start(self):
+        # the bus key goes through the environment, never the command line
+        self.process = subprocess.Popen(self.command(), env=self.bus.environ())
+        self.started = time.time()
+        return self
+
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self, timeout=5):
+        if not self.running():
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class Orchestrator:
+    def __init__(self, rows, bus, report_interval=10.0):
+        self.workers = {config["row"]: DetectionWorker(config, bus) for config in rows}
+        self.report_interval = report_interval
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        bus.subscribe("stats", self.on_stats)
+
+    def on_stats(self, stats):
+        with self.lock:
+            self.stats[stats[0]] = stats
+
+    def start(self):
+        for row, worker in sorted(self.workers.items()):
+            worker.start()
+            config = worker.config
+            print(f"row {row}: {config['input']} ({config['direction']}) on CPUs {config['cpus'] or 'any'}, "
+                  f"pid {worker.process.pid}")
+        if self.report_interval:
+            self.thread = threading.Thread(target=self.report_loop, daemon=True)
+            self.thread.start()
+        return self
+
+    def report(self):
+        with self.lock:
+            stats = dict(self.stats)
+        lines = [f"{'row':>4} {'frames':>8} {'fps':>8} {'crossings':>10} {'latency':>10}  state"]
+        total_fps = 0.0
+        for row, worker in sorted(self.workers.items()):
+            state = "running" if worker.running() else f"exited ({worker.process.returncode})"
+            if row not in stats:
+                lines.append(f"{row:>4} {'-':>8} {'-':>8} {'-':>10} {'-':>10}  {state}")
+                continue
+            _, frames, elapsed, crossings, latency_ms = stats[row]
+            fps = frames / max(elapsed, 1e-6)
+            total_fps += fps
+            lines.append(f"{row:>4} {frames:>8} {fps:>8.2f} {crossings:>10} {latency_ms:>8.1f}ms  {state}")
+        lines.append(f"total {total_fps:.2f} frames/s over {len(self.workers)} workers")
+        return "\n".join(lines)
+
+    def report_loop(self):
+        while not self.stopped.wait(self.report_interval):
+            print(self.report())
+            if not any(worker.running() for worker in self.workers.values()):
+                break
+
+    def wait(self):
+        for worker in self.workers.values():
+            if worker.process is not None:
+                worker.process.wait()
+
+    def stop(self):
+        self.stopped.set()
+        for worker in self.workers.values():
+            worker.stop()
+        print(self.report())
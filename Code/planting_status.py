@@ -0,0 +1,518 @@
+import math
+import numpy as np
+import pandas as pd
+from seedling_table import (SeedlingTable, RowView, CoordinateSet, LABEL_CODES, STATUS_NAMES, UNKNOWN_LABEL,
+                            OVERLAP, NO_STATUS, label_code)
+
+def latlon_to_xy(lat, lon, ref_lat=24.64):
+    meters_per_deg_lat = 111000  # 1kat ≈ 111km
+    meters_per_deg_lon = 111000 * math.cos(math.radians(ref_lat))  
+    x = lon * meters_per_deg_lon
+    y = lat * meters_per_deg_lat
+    return x, y
+
+def euclidean_distance(lat1, lon1, lat2, lon2, ref_lat=24.64):
+    x1, y1 = latlon_to_xy(lat1, lon1, ref_lat)
+    x2, y2 = latlon_to_xy(lat2, lon2, ref_lat)
+    distance = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
+    return distance
+
+# status 
+def classify_planting_status(seedlings, standard_spacing):
+    S = standard_spacing 
+    S_min = 0.4 * S     
+    S_max = 1.6 * S     
+    
+    statuses = {}        
+    counts = {           
+        "Normal": 0,
+        "Root Exposed": 0,
+        "Buried": 0,
+        "Overlap": 0,    
+        "Missing": 0
+    }
+    missed_points = []   
+    overlap_group = []   
+    
+    unique_seedlings = []
+    seen_coords = set()
+    for s in seedlings:
+        coord = (s["lat"], s["lon"])
+        if coord not in seen_coords:
+            seen_coords.add(coord)
+            unique_seedlings.append(s)
+    
+    # deal with first seedling
+    if unique_seedlings:
+        frame_id = f"seedling_{unique_seedlings[0]['frame']}"
+        if unique_seedlings[0]["label"] == "Seedling":
+            statuses[frame_id] = "Normal"
+            counts["Normal"] += 1
+        elif unique_seedlings[0]["label"] == "Root":
+            statuses[frame_id] = "Root Exposed"
+            counts["Root Exposed"] += 1
+        elif unique_seedlings[0]["label"] == "Buried Seedling":
+            statuses[frame_id] = "Buried"
+            counts["Buried"] += 1
+    
+    # check in list
+    for i in range(1, len(unique_seedlings)):
+        seedling_id = f"seedling_{unique_seedlings[i]['frame']}"
+        current = unique_seedlings[i]
+        previous = unique_seedlings[i-1]
+        distance = euclidean_distance(current["lat"], current["lon"], previous["lat"], previous["lon"])
+      
+        if distance < S_min:
+            if not overlap_group or overlap_group[-1][-1] == previous["frame"]:
+                if not overlap_group:
+                    overlap_group.append([previous["frame"], current["frame"]])
+                else:
+                    overlap_group[-1].append(current["frame"])
+            else:
+                overlap_group.append([previous["frame"], current["frame"]])
+            statuses[f"seedling_{previous['frame']}"] = "Overlap"
+            statuses[seedling_id] = "Overlap"
+            if statuses[f"seedling_{previous['frame']}"] != "Overlap": 
+                if unique_seedlings[i-1]["label"] == "Seedling":
+                    counts["Normal"] -= 1
+                elif unique_seedlings[i-1]["label"] == "Root":
+                    counts["Root Exposed"] -= 1
+                elif unique_seedlings[i-1]["label"] == "Buried Seedling":
+                    counts["Buried"] -= 1
+        else:
+            if overlap_group:
+                counts["Overlap"] += 1
+                overlap_group = []
+            
+            if distance > S_max:
+                mid_lat = (current["lat"] + previous["lat"]) / 2
+                mid_lon = (current["lon"] + previous["lon"]) / 2
+                missed_points.append({
+                    "lat": mid_lat,
+                    "lon": mid_lon,
+                    "frame_prev": previous["frame"],
+                    "frame_curr": current["frame"]
+                })
+                counts["Missing"] += 1
+                if current["label"] == "Seedling":
+                    statuses[seedling_id] = "Normal"
+                    counts["Normal"] += 1
+                elif current["label"] == "Root":
+                    statuses[seedling_id] = "Root Exposed"
+                    counts["Root Exposed"] += 1
+                elif current["label"] == "Buried Seedling":
+                    statuses[seedling_id] = "Buried"
+                    counts["Buried"] += 1
+            else:
+                if current["label"] == "Seedling":
+                    statuses[seedling_id] = "Normal"
+                    counts["Normal"] += 1
+                elif current["label"] == "Root":
+                    statuses[seedling_id] = "Root Exposed"
+                    counts["Root Exposed"] += 1
+                elif current["label"] == "Buried Seedling":
+                    statuses[seedling_id] = "Buried"
+                    counts["Buried"] += 1
+    
+    if overlap_group:
+        counts["Overlap"] += 1
+      
+    if len(unique_seedlings) > 1 and statuses.get(f"seedling_{unique_seedlings[0]['frame']}") != "Overlap":
+        distance = euclidean_distance(unique_seedlings[0]["lat"], unique_seedlings[0]["lon"], 
+                                     unique_seedlings[1]["lat"], unique_seedlings[1]["lon"])
+        if distance < S_min:
+            statuses[f"seedling_{unique_seedlings[0]['frame']}"] = "Overlap"
+            if overlap_group and overlap_group[0][0] == unique_seedlings[1]["frame"]:
+                overlap_group[0].insert(0, unique_seedlings[0]["frame"])
+            else:
+                counts["Overlap"] += 1
+                overlap_group.insert(0, [unique_seedlings[0]["frame"], unique_seedlings[1]["frame"]])
+            if unique_seedlings[0]["label"] == "Seedling":
+                counts["Normal"] -= 1
+            elif unique_seedlings[0]["label"] == "Root":
+                counts["Root Exposed"] -= 1
+            elif unique_seedlings[0]["label"] == "Buried Seedling":
+                counts["Buried"] -= 1
+    
+    return statuses, counts, missed_points
+
+def process_csv(file_path):
+    df = pd.read_csv(file_path)
+    seedlings = []
+    for _, row in df.iterrows():
+        seedlings.append({
+            "label": row["Label"],  # 支持Seedling, Root, Buried Seedling
+            "frame": row["Frame_Number"],
+            "lat": float(row["Latitude"]),
+            "lon": float(row["Longitude"]),
+            "row": int(row.get("Row", 0))
+        })
+    return seedlings
+
+
+def process_store(store):
+    return [{"label": label, "frame": frame, "lat": float(lat), "lon": float(lon), "row": row}
+            for label, frame, _, lat, lon, _, _, row in store.fetch_all()]
+
+# Incremental form of classify_planting_status over a SeedlingTable: each
+# seedling only ever changes its own status and its predecessor's, so an
+# append costs O(1). Overlap runs are counted when they open rather than when
+# they close, which gives the same totals as the batch function on every
+# prefix. Statuses are int8 codes per row; the f-string keyed dict is only
+# built on request (statuses_dict) for callers of the old API.
+class StreamingClassifier:
+    def __init__(self, standard_spacing, table=None):
+        self.S_min = 0.4 * standard_spacing
+        self.S_max = 1.6 * standard_spacing
+        self.table = table if table is not None else SeedlingTable()
+        self.reset()
+
+    def reset(self):
+        self.table.clear()
+        self.counts = {
+            "Normal": 0,
+            "Root Exposed": 0,
+            "Buried": 0,
+            "Overlap": 0,
+            "Missing": 0
+        }
+        self.missed_points = []
+        self.seen_coords = CoordinateSet()
+        self.first_pair_close = False
+        self.in_overlap = False
+        self.run_start = -1
+        self.first_key_row = -1
+        self.fixup = None
+        self.touched = {}
+
+    def _set_status(self, row, code):
+        status = self.table.status
+        if row not in self.touched:
+            self.touched[row] = status[row]
+        status[row] = code
+        if self.table.frame[row] == self.table.frame[0] and row > self.first_key_row:
+            self.first_key_row = row
+
+    # The batch function re-checks the first pair after its loop. That only has
+    # an effect when a later seedling with the same frame number overwrote the
+    # first one's dict entry, so it is kept as a count correction that is undone
+    # before each append and re-evaluated after it.
+    def _revert_fixup(self):
+        if self.fixup is None:
+            return
+        overlap_added, label_status = self.fixup
+        self.counts["Overlap"] -= overlap_added
+        if label_status is not None:
+            self.counts[label_status] += 1
+        self.fixup = None
+
+    def _apply_fixup(self):
+        if not self.first_pair_close or self.table.status[self.first_key_row] == OVERLAP:
+            return
+        frame = self.table.frame
+        joins_open_run = self.in_overlap and frame[self.run_start] == frame[1]
+        overlap_added = 0 if joins_open_run else 1
+        self.counts["Overlap"] += overlap_added
+        label = self.table.label[0]
+        label_status = STATUS_NAMES[label] if label < UNKNOWN_LABEL else None
+        if label_status is not None:
+            self.counts[label_status] -= 1
+        self.fixup = (overlap_added, label_status)
+
+    def _classify(self, row, changes):
+        table = self.table
+        label = table.label[row]
+        known = label < UNKNOWN_LABEL
+
+        if row == 0:
+            if known:
+                self._set_status(row, label)
+                self.counts[STATUS_NAMES[label]] += 1
+            return
+
+        previous = row - 1
+        lat, lon = table.lat[row], table.lon[row]
+        prev_lat, prev_lon = table.lat[previous], table.lon[previous]
+        distance = euclidean_distance(lat, lon, prev_lat, prev_lon)
+        if row == 1:
+            self.first_pair_close = distance < self.S_min
+
+        if distance < self.S_min:
+            if not self.in_overlap:
+                self.in_overlap = True
+                self.run_start = previous
+                self.counts["Overlap"] += 1
+            self._set_status(previous, OVERLAP)
+            self._set_status(row, OVERLAP)
+            return
+
+        self.in_overlap = False
+        if distance > self.S_max:
+            missed = {
+                "lat": (lat + prev_lat) / 2,
+                "lon": (lon + prev_lon) / 2,
+                "frame_prev": int(table.frame[previous]),
+                "frame_curr": int(table.frame[row])
+            }
+            self.missed_points.append(missed)
+            changes["missed_points"].append(missed)
+            self.counts["Missing"] += 1
+        if known:
+            self._set_status(row, label)
+            self.counts[STATUS_NAMES[label]] += 1
+
+    def add(self, seedling, changes=None):
+        # returns only what changed: rows whose status changed (new rows included),
+        # counts that moved and new missed points
+        if changes is None:
+            changes = {"rows": set(), "counts": {}, "missed_points": []}
+        lat, lon = float(seedling["lat"]), float(seedling["lon"])
+        if self.seen_coords.insert(len(self.table), lat, lon, self.table.lat, self.table.lon) != len(self.table):
+            return changes
+
+        counts_before = dict(self.counts)
+        self.touched = {}
+        row = self.table.append(seedling["frame"], lat, lon, label_code(seedling["label"]))
+        changes["rows"].add(row)
+        self._revert_fixup()
+        self._classify(row, changes)
+        self._apply_fixup()
+
+        status = self.table.status
+        changes["rows"].update(r for r, old in self.touched.items() if status[r] != old)
+        for name, count in self.counts.items():
+            if count != counts_before[name]:
+                changes["counts"][name] = count
+        return changes
+
+    def add_many(self, seedlings):
+        changes = {"rows": set(), "counts": {}, "missed_points": []}
+        for seedling in seedlings:
+            self.add(seedling, changes)
+        return changes
+
+    def stable_rows(self):
+        # rows before this index can no longer change status or join an overlap run:
+        # the next seedling only touches the last row, and a run ending right before it could still grow
+        status = self.table.status
+        boundary = max(len(status) - 1, 0)
+        while boundary > 0 and status[boundary - 1] == OVERLAP:
+            boundary -= 1
+        return boundary
+
+    def status_name(self, row):
+        code = self.table.status[row]
+        return STATUS_NAMES[code] if code != NO_STATUS else None
+
+    def statuses_dict(self):
+        # the {"seedling_<frame>": status} view returned by classify_planting_status
+        table = self.table
+        frames = table.frame.tolist()
+        names = [STATUS_NAMES[code] if code != NO_STATUS else None for code in table.status.tolist()]
+        statuses = {f"seedling_{frame}": name for frame, name in zip(frames, names) if name is not None}
+        if self.fixup is not None:
+            statuses[f"seedling_{frames[0]}"] = "Overlap"
+        return statuses
+
+
+# Spacing, gaps and overlaps only mean something along one planting row, so
+# every row gets its own StreamingClassifier. Each works on a RowView of one
+# shared table that holds every seedling once, in arrival order with its row in
+# table.row, so the dashboard, the twin and the exports keep a single index
+# space. Changes and counts look the same as a single StreamingClassifier's.
+class RowClassifier:
+    def __init__(self, standard_spacing, table=None):
+        self.standard_spacing = standard_spacing
+        self.table = table if table is not None else SeedlingTable()
+        self.reset()
+
+    def reset(self):
+        self.table.clear()
+        self.rows = {}
+        self.counts = {name: 0 for name in STATUS_NAMES}
+        self.missed_points = []
+
+    def add(self, seedling, changes=None):
+        if changes is None:
+            changes = {"rows": set(), "counts": {}, "missed_points": []}
+        row = int(seedling.get("row", 0))
+        classifier = self.rows.get(row)
+        if classifier is None:
+            classifier = self.rows[row] = StreamingClassifier(self.standard_spacing, RowView(self.table, row))
+        local = classifier.add(seedling)
+        if not local["rows"]:
+            # already seen at this position in this row
+            return changes
+
+        # statuses are already in the shared table; report its indices
+        changes["rows"].update(classifier.table.positions[sorted(local["rows"])].tolist())
+        for name in local["counts"]:
+            self.counts[name] = sum(c.counts[name] for c in self.rows.values())
+            changes["counts"][name] = self.counts[name]
+        for missed in local["missed_points"]:
+            missed["row"] = row
+            self.missed_points.append(missed)
+            changes["missed_points"].append(missed)
+        return changes
+
+    def add_many(self, seedlings):
+        changes = {"rows": set(), "counts": {}, "missed_points": []}
+        for seedling in seedlings:
+            self.add(seedling, changes)
+        return changes
+
+    def stable_rows(self):
+        # per planting row, how many of its seedlings can no longer change status; kept
+        # per row because a camera that stops would otherwise hold back every other row
+        return {row: classifier.stable_rows() for row, classifier in self.rows.items()}
+
+    def table_index(self, starts, ends=None):
+        # shared table indices of each row's seedlings [starts[row], ends[row]), row after row,
+        # so every planting row's seedlings stay contiguous and in order
+        parts = [self.rows[row].table.positions[starts.get(row, 0):None if ends is None else ends[row]]
+                 for row in sorted(self.rows)]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def status_name(self, index):
+        code = self.table.status[index]
+        return STATUS_NAMES[code] if code != NO_STATUS else None
+
+
+# Vectorized batch form of classify_planting_status for offline analysis.
+# Labels and statuses are small integer codes; the dict-returning wrapper is
+# only needed when the result must look exactly like the original function's.
+def label_codes(labels):
+    codes = pd.Series(labels, dtype=object).map(LABEL_CODES)
+    return codes.fillna(UNKNOWN_LABEL).to_numpy(dtype=np.int8)
+
+
+def load_columns(file_path):
+    df = pd.read_csv(file_path, usecols=lambda c: c in ("Label", "Frame_Number", "Latitude", "Longitude", "Row"))
+    return {
+        "label": label_codes(df["Label"].to_numpy()),
+        "frame": df["Frame_Number"].to_numpy(),
+        "lat": df["Latitude"].to_numpy(dtype=np.float64),
+        "lon": df["Longitude"].to_numpy(dtype=np.float64),
+        "row": df["Row"].to_numpy(dtype=np.int64) if "Row" in df else np.zeros(len(df), dtype=np.int64)
+    }
+
+
+def seedling_columns(seedlings):
+    return {
+        "label": label_codes([s["label"] for s in seedlings]),
+        "frame": np.array([s["frame"] for s in seedlings]),
+        "lat": np.array([s["lat"] for s in seedlings], dtype=np.float64),
+        "lon": np.array([s["lon"] for s in seedlings], dtype=np.float64)
+    }
+
+
+def classify_planting_status_arrays(lat, lon, labels, frames, standard_spacing, ref_lat=24.64):
+    S_min = 0.4 * standard_spacing
+    S_max = 1.6 * standard_spacing
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.int8)
+    frames = np.asarray(frames)
+
+    keep = np.flatnonzero(~pd.DataFrame({"lat": lat, "lon": lon}).duplicated().to_numpy())
+    lat, lon, labels, frames = lat[keep], lon[keep], labels[keep], frames[keep]
+    n = len(keep)
+
+    # same arithmetic as euclidean_distance, so comparisons against S_min/S_max agree bit for bit
+    x = lon * (111000 * math.cos(math.radians(ref_lat)))
+    y = lat * 111000
+    distance = np.sqrt((x[:-1] - x[1:]) ** 2 + (y[:-1] - y[1:]) ** 2)
+    close = distance < S_min
+    far = distance > S_max
+
+    close_prev = np.zeros(n, dtype=bool)
+    close_next = np.zeros(n, dtype=bool)
+    close_prev[1:] = close
+    close_next[:-1] = close
+    known = labels < UNKNOWN_LABEL
+
+    status = np.where(known, labels, NO_STATUS).astype(np.int8)
+    status[close_prev | close_next] = OVERLAP
+
+    counted = known & ~close_prev
+    label_counts = np.bincount(labels[counted], minlength=UNKNOWN_LABEL)
+    run_starts = np.flatnonzero(close & ~close_prev[:-1]) if n > 1 else np.zeros(0, dtype=np.int64)
+    counts = {STATUS_NAMES[code]: int(label_counts[code]) for code in range(UNKNOWN_LABEL)}
+    counts["Overlap"] = len(run_starts)
+    counts["Missing"] = int(far.sum())
+
+    missed_idx = np.flatnonzero(far)
+    missed = {
+        "lat": (lat[missed_idx + 1] + lat[missed_idx]) / 2,
+        "lon": (lon[missed_idx + 1] + lon[missed_idx]) / 2,
+        "prev": keep[missed_idx],
+        "curr": keep[missed_idx + 1]
+    }
+
+    # classify_planting_status re-checks the first pair after its loop; that only
+    # changes anything when a later seedling with the first one's frame number
+    # overwrote its dict entry, which first_key_status reproduces.
+    first_key_fixed = False
+    if n > 1 and close[0]:
+        same_key = np.flatnonzero((frames == frames[0]) & (status != NO_STATUS))
+        if status[same_key[-1]] != OVERLAP:
+            first_key_fixed = True
+            open_run_joins = close[-1] and frames[run_starts[-1]] == frames[1]
+            if not open_run_joins:
+                counts["Overlap"] += 1
+            if known[0]:
+                counts[STATUS_NAMES[labels[0]]] -= 1
+
+    return {
+        "index": keep,
+        "status": status,
+        "counts": counts,
+        "missed": missed,
+        "first_key_fixed": first_key_fixed
+    }
+
+
+def classify_planting_status_batch(columns, standard_spacing):
+    # drop-in for classify_planting_status; accepts load_columns() output or a seedling list
+    if not isinstance(columns, dict):
+        columns = seedling_columns(columns)
+    result = classify_planting_status_arrays(columns["lat"], columns["lon"], columns["label"],
+                                             columns["frame"], standard_spacing)
+    frames = columns["frame"][result["index"]].tolist()
+    status = result["status"]
+    has_status = np.flatnonzero(status != NO_STATUS)
+    names = np.array(STATUS_NAMES, dtype=object)[status[has_status]]
+    statuses = dict(zip([f"seedling_{frames[i]}" for i in has_status], names.tolist()))
+    if result["first_key_fixed"]:
+        statuses[f"seedling_{frames[0]}"] = "Overlap"
+
+    all_frames = columns["frame"].tolist()
+    missed = result["missed"]
+    missed_points = [
+        {"lat": mid_lat, "lon": mid_lon, "frame_prev": all_frames[prev], "frame_curr": all_frames[curr]}
+        for mid_lat, mid_lon, prev, curr in zip(missed["lat"].tolist(), missed["lon"].tolist(),
+                                                missed["prev"].tolist(), missed["curr"].tolist())
+    ]
+    return statuses, result["counts"], missed_points
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(description="classify archived sessions")
+    parser.add_argument("files", nargs="+", help="enriched crossing_records CSV files")
+    parser.add_argument("--spacing", type=float, default=0.5)
+    args = parser.parse_args()
+
+    writer = sys.stdout
+    writer.write("file,row," + ",".join(STATUS_NAMES) + "\n")
+    for file_path in args.files:
+        columns = load_columns(file_path)
+        # each planting row is classified on its own
+        for row in np.unique(columns["row"]):
+            mask = columns["row"] == row
+            counts = classify_planting_status_arrays(columns["lat"][mask], columns["lon"][mask],
+                                                     columns["label"][mask], columns["frame"][mask],
+                                                     args.spacing)["counts"]
+            writer.write(f"{file_path},{row}," + ",".join(str(counts[name]) for name in STATUS_NAMES) + "\n")
@@ -0,0 +1,137 @@
+import csv
+import sqlite3
+import threading
+
+COLUMNS = ['Label', 'Frame_Number', 'Timestamp', 'Latitude', 'Longitude', 'Speed', 'Course', 'Row']
+
+
+# frame numbers restart with every count.py run and are per camera, so the
+# event-log session and the planting row are part of the key
+SCHEMA = '''
+    CREATE TABLE {} (
+        label TEXT NOT NULL,
+        frame INTEGER NOT NULL,
+        timestamp TEXT,
+        latitude REAL,
+        longitude REAL,
+        speed REAL,
+        course REAL,
+        created INTEGER NOT NULL,
+        seq INTEGER NOT NULL,
+        row INTEGER NOT NULL DEFAULT 0,
+        session REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (session, row, label, frame)
+    )'''
+# readers see the newest session of each planting row, as a new run used to start a fresh CSV;
+# earlier sessions stay in the table
+CURRENT = 'session = (SELECT MAX(session) FROM records AS latest WHERE latest.row = records.row)'
+
+
+class RecordStore:
+    def __init__(self, path='crossing_records.db', synchronous='NORMAL'):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(f'PRAGMA synchronous={synchronous}')
+        self.conn.execute(SCHEMA.format('IF NOT EXISTS records'))
+        self._migrate()
+        # created keeps first-seen order for the classifier; seq marks every change for readers
+        self.conn.execute('CREATE INDEX IF NOT EXISTS records_seq ON records(seq)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS records_created ON records(created)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS records_row_session ON records(row, session)')
+        self.seq = self.conn.execute('SELECT COALESCE(MAX(seq), 0) FROM records').fetchone()[0]
+        self.index = {(label, frame, row, session): created for label, frame, row, session, created in
+                      self.conn.execute('SELECT label, frame, row, session, created FROM records')}
+        self.next_created = max(self.index.values(), default=0) + 1
+
+    def _migrate(self):
+        # stores written before rows or sessions existed: every record becomes row 0 / session 0
+        columns = [info[1] for info in self.conn.execute('PRAGMA table_info(records)')]
+        if 'row' in columns and 'session' in columns:
+            return
+        kept = ', '.join(column for column in columns if column in
+                         ('label', 'frame', 'timestamp', 'latitude', 'longitude', 'speed', 'course',
+                          'created', 'seq', 'row'))
+        self.conn.execute('BEGIN')
+        self.conn.execute('ALTER TABLE records RENAME TO records_old')
+        self.conn.execute(SCHEMA.format('records'))
+        self.conn.execute(f'INSERT INTO records ({kept}) SELECT {kept} FROM records_old')
+        self.conn.execute('DROP TABLE records_old')
+        self.conn.execute('DROP INDEX IF EXISTS records_seq')
+        self.conn.execute('DROP INDEX IF EXISTS records_created')
+        self.conn.execute('COMMIT')
+
+    def __contains__(self, key):
+        # (label, frame), (label, frame, row) or (label, frame, row, session)
+        return (key[0], int(key[1]), int(key[2]) if len(key) > 2 else 0,
+                float(key[3]) if len(key) > 3 else 0.0) in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self):
+        return list(self.index)
+
+    def upsert(self, record):
+        return self.upsert_many([record])[0]
+
+    def upsert_many(self, records):
+        # returns the seq given to each record, in order
+        rows = []
+        with self.lock:
+            for record in records:
+                label, frame, timestamp, lat, lon, speed, course = record[:7]
+                row = int(record[7]) if len(record) > 7 else 0
+                session = float(record[8]) if len(record) > 8 else 0.0
+                key = (str(label), int(frame), row, session)
+                created = self.index.get(key)
+                if created is None:
+                    created = self.next_created
+                    self.next_created += 1
+                    self.index[key] = created
+                self.seq += 1
+                rows.append((key[0], key[1], str(timestamp), float(lat), float(lon),
+                             float(speed), float(course), created, self.seq, row, session))
+            self.conn.execute('BEGIN')
+            self.conn.executemany('''
+                INSERT INTO records (label, frame, timestamp, latitude, longitude, speed, course, created, seq, row,
+                                     session)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(session, row, label, frame) DO UPDATE SET
+                    timestamp=excluded.timestamp, latitude=excluded.latitude,
+                    longitude=excluded.longitude, speed=excluded.speed,
+                    course=excluded.course, seq=excluded.seq''', rows)
+            self.conn.execute('COMMIT')
+        return [row[8] for row in rows]
+
+    def last_seq(self):
+        with self.lock:
+            return self.conn.execute('SELECT COALESCE(MAX(seq), 0) FROM records').fetchone()[0]
+
+    def fetch_since(self, seq):
+        # current rows inserted or updated after `seq`, with their session and the new high-water mark
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT label, frame, timestamp, latitude, longitude, speed, course, row, session, seq '
+                f'FROM records WHERE seq > ? AND {CURRENT} ORDER BY seq', (seq,)).fetchall()
+        if rows:
+            seq = rows[-1][9]
+        return [row[:9] for row in rows], seq
+
+    def fetch_all(self):
+        with self.lock:
+            return self.conn.execute(
+                'SELECT label, frame, timestamp, latitude, longitude, speed, course, row '
+                f'FROM records WHERE {CURRENT} ORDER BY created').fetchall()
+
+    def export_csv(self, path='crossing_records.csv'):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(self.fetch_all())
+        return path
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,91 @@
+import threading
+import time
+
+
+# Coalesces UI refresh requests from worker threads into at most one draw per
+# frame budget. Workers submit snapshots; the Tk thread polls on a timer, so no
+# Tk call is ever made off the main thread and the data lock is never held
+# while drawing.
+class RefreshScheduler:
+    def __init__(self, root, draw, merge=None, max_rate=5.0):
+        self.root = root
+        self.draw = draw
+        self.merge = merge
+        self.interval_ms = max(1, int(1000 / max_rate))
+        self.lock = threading.Lock()
+        self.pending = None
+        self.has_pending = False
+        self.running = False
+        self.after_id = None
+
+        self.requests = 0
+        self.refreshes = 0
+        self.merged = 0
+        self.dropped = 0
+        self.draw_time = 0.0
+        self.max_draw_time = 0.0
+
+    def submit(self, snapshot=None):
+        # callable from any thread; an undrawn snapshot is folded into the new one
+        with self.lock:
+            self.requests += 1
+            if self.has_pending:
+                self.merged += 1
+                if self.merge is not None:
+                    snapshot = self.merge(self.pending, snapshot)
+            self.pending = snapshot
+            self.has_pending = True
+
+    def start(self):
+        self.running = True
+        self.after_id = self.root.after(self.interval_ms, self.tick)
+
+    def tick(self):
+        with self.lock:
+            snapshot, has_pending = self.pending, self.has_pending
+            self.pending = None
+            self.has_pending = False
+        if has_pending:
+            start = time.time()
+            try:
+                self.draw(snapshot)
+                self.refreshes += 1
+            except Exception as e:
+                self.dropped += 1
+                print(f"ERROR: {e}")
+            elapsed = time.time() - start
+            self.draw_time += elapsed
+            self.max_draw_time = max(self.max_draw_time, elapsed)
+        if self.running:
+            self.after_id = self.root.after(self.interval_ms, self.tick)
+
+    def stop(self):
+        self.running = False
+        if self.after_id is not None:
+            try:
+                self.root.after_cancel(self.after_id)
+            except Exception:
+                pass
+            self.after_id = None
+        with self.lock:
+            if self.has_pending:
+                self.dropped += 1
+            self.pending = None
+            self.has_pending = False
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "refreshes": self.refreshes,
+                "merged": self.merged,
+                "dropped": self.dropped,
+                "mean_draw_ms": 1000 * self.draw_time / self.refreshes if self.refreshes else 0.0,
+                "max_draw_ms": 1000 * self.max_draw_time
+            }
+
+    def report(self):
+        stats = self.stats()
+        return (f"refreshes: {stats['refreshes']}/{stats['requests']} requests, "
+                f"merged {stats['merged']}, dropped {stats['dropped']}, "
+                f"draw {stats['mean_draw_ms']:.1f} ms mean / {stats['max_draw_ms']:.1f} ms max")
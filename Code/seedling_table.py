@@ -0,0 +1,260 @@
+import struct
+import numpy as np
+
+LABELS = ("Seedling", "Root", "Buried Seedling")
+STATUS_NAMES = ("Normal", "Root Exposed", "Buried", "Overlap", "Missing")
+UNKNOWN_LABEL = len(LABELS)
+OVERLAP = STATUS_NAMES.index("Overlap")
+NO_STATUS = -1
+LABEL_CODES = {label: code for code, label in enumerate(LABELS)}
+
+
+def label_code(label):
+    return LABEL_CODES.get(label, UNKNOWN_LABEL)
+
+
+# Array-backed seedling columns: 28 bytes per plant (int64 frame, float64
+# lat/lon, int8 label/status, uint16 planting row). Capacity doubles when full;
+# the accessors return views of the filled part, so readers never copy. A
+# StreamingClassifier adds 8-16 bytes per plant for its CoordinateSet.
+class SeedlingTable:
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self._frame = np.empty(capacity, dtype=np.int64)
+        self._lat = np.empty(capacity, dtype=np.float64)
+        self._lon = np.empty(capacity, dtype=np.float64)
+        self._label = np.empty(capacity, dtype=np.int8)
+        self._status = np.empty(capacity, dtype=np.int8)
+        self._row = np.empty(capacity, dtype=np.uint16)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        return len(self._frame)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self._frame, self._lat, self._lon, self._label, self._status, self._row))
+
+    def _reserve(self, needed):
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, 2 * self.capacity)
+        for name in ("_frame", "_lat", "_lon", "_label", "_status", "_row"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def append(self, frame, lat, lon, label, status=NO_STATUS, row=0):
+        self._reserve(self.size + 1)
+        i = self.size
+        self._frame[i] = frame
+        self._lat[i] = lat
+        self._lon[i] = lon
+        self._label[i] = label if not isinstance(label, str) else label_code(label)
+        self._status[i] = status
+        self._row[i] = row
+        self.size += 1
+        return i
+
+    def extend(self, frames, lats, lons, labels, rows=0):
+        count = len(frames)
+        self._reserve(self.size + count)
+        start, end = self.size, self.size + count
+        self._frame[start:end] = frames
+        self._lat[start:end] = lats
+        self._lon[start:end] = lons
+        self._label[start:end] = labels
+        self._status[start:end] = NO_STATUS
+        self._row[start:end] = rows
+        self.size = end
+        return start
+
+    def clear(self):
+        self.size = 0
+
+    @property
+    def frame(self):
+        return self._frame[:self.size]
+
+    @property
+    def lat(self):
+        return self._lat[:self.size]
+
+    @property
+    def lon(self):
+        return self._lon[:self.size]
+
+    @property
+    def label(self):
+        return self._label[:self.size]
+
+    @property
+    def status(self):
+        return self._status[:self.size]
+
+    @property
+    def row(self):
+        return self._row[:self.size]
+
+    def copy(self):
+        table = SeedlingTable(max(1, self.size))
+        table.extend(self.frame, self.lat, self.lon, self.label, self.row)
+        table.status[:] = self.status
+        return table
+
+
+# One planting row of a shared SeedlingTable, for a classifier that works in
+# row-local positions: local position i is table index positions[i]. Reads and
+# status writes go straight to the shared columns, so a plant is stored once
+# plus 8 bytes for its index.
+class RowView:
+    def __init__(self, table, row, capacity=1024):
+        self.table = table
+        self.row = row
+        self.size = 0
+        self._positions = np.empty(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        return self._positions.nbytes
+
+    @property
+    def positions(self):
+        return self._positions[:self.size]
+
+    def append(self, frame, lat, lon, label, status=NO_STATUS):
+        if self.size == len(self._positions):
+            positions = np.empty(2 * self.size, dtype=np.int64)
+            positions[:self.size] = self._positions
+            self._positions = positions
+        self._positions[self.size] = self.table.append(frame, lat, lon, label, status, self.row)
+        self.size += 1
+        return self.size - 1
+
+    def clear(self):
+        # the shared table is cleared by its owner
+        self.size = 0
+
+    @property
+    def frame(self):
+        return RowColumn(self.table._frame, self._positions, self.size)
+
+    @property
+    def lat(self):
+        return RowColumn(self.table._lat, self._positions, self.size)
+
+    @property
+    def lon(self):
+        return RowColumn(self.table._lon, self._positions, self.size)
+
+    @property
+    def label(self):
+        return RowColumn(self.table._label, self._positions, self.size)
+
+    @property
+    def status(self):
+        return RowColumn(self.table._status, self._positions, self.size)
+
+
+class RowColumn:
+    # a shared column indexed by row-local position; scalar or array indices below size.
+    # Built per access from the unsliced arrays, since classifiers read it once per value
+    def __init__(self, column, positions, size):
+        self.column = column
+        self.positions = positions
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        return self.column[self.positions[i]]
+
+    def __setitem__(self, i, value):
+        self.column[self.positions[i]] = value
+
+    def tolist(self):
+        return self.column[self.positions[:self.size]].tolist()
+
+
+HASH_LAT = 0x9E3779B97F4A7C15
+HASH_LON = 0xC2B2AE3D27D4EB4F
+UINT64_MASK = (1 << 64) - 1
+
+
+def coordinate_hash(lat, lon):
+    # 64-bit mix of the float64 bit patterns; + 0.0 folds -0.0 into 0.0, which compares equal
+    lat = np.asarray(lat, dtype=np.float64) + 0.0
+    lon = np.asarray(lon, dtype=np.float64) + 0.0
+    h = lat.view(np.uint64) * np.uint64(HASH_LAT) ^ lon.view(np.uint64) * np.uint64(HASH_LON)
+    return h ^ (h >> np.uint64(29))
+
+
+def coordinate_hash_scalar(lat, lon):
+    # coordinate_hash of one pair with Python ints, without the array round trip
+    lat_bits, lon_bits = struct.unpack("<QQ", struct.pack("<dd", lat + 0.0, lon + 0.0))
+    h = (lat_bits * HASH_LAT & UINT64_MASK) ^ (lon_bits * HASH_LON & UINT64_MASK)
+    return h ^ (h >> 29)
+
+
+# Set of table positions keyed by their (lat, lon), for dropping repeated
+# coordinates. Open addressing with linear probing in an int32 array kept at
+# most half full, so 8-16 bytes per plant; the coordinates themselves are read
+# from the table's columns rather than stored again.
+class CoordinateSet:
+    def __init__(self, capacity=1024):
+        self.slots = np.full(capacity, -1, dtype=np.int32)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        return self.slots.nbytes
+
+    def _slot(self, lat, lon, lats, lons):
+        # slot holding these coordinates, or the empty slot where they would go
+        mask = len(self.slots) - 1
+        i = coordinate_hash_scalar(float(lat), float(lon)) & mask
+        while True:
+            position = self.slots[i]
+            if position < 0 or (lats[position] == lat and lons[position] == lon):
+                return i
+            i = (i + 1) & mask
+
+    def insert(self, position, lat, lon, lats, lons):
+        # position of the plant at (lat, lon): an earlier one, or position itself when it is new
+        # and has been added. lats/lons are the table columns, with or without position yet
+        if 2 * (self.size + 1) > len(self.slots):
+            self._grow(lats, lons)
+        slot = self._slot(lat, lon, lats, lons)
+        existing = self.slots[slot]
+        if existing >= 0:
+            return int(existing)
+        self.slots[slot] = position
+        self.size += 1
+        return position
+
+    def _grow(self, lats, lons):
+        positions = self.slots[self.slots >= 0]
+        self.slots = np.full(2 * len(self.slots), -1, dtype=np.int32)
+        mask = np.uint64(len(self.slots) - 1)
+        home = (coordinate_hash(lats[positions], lons[positions]) & mask).astype(np.int64)
+        # place every position whose slot is free, one per slot, and probe on with the rest
+        while len(positions):
+            free = np.flatnonzero(self.slots[home] < 0)
+            _, first = np.unique(home[free], return_index=True)
+            placed = free[first]
+            self.slots[home[placed]] = positions[placed]
+            waiting = np.ones(len(positions), dtype=bool)
+            waiting[placed] = False
+            positions = positions[waiting]
+            home = (home[waiting] + 1) & (len(self.slots) - 1)
@@ -0,0 +1,120 @@
+import numpy as np
+
+TRACKERS = ("botsort", "bytetrack", "centroid")
+
+
+def box_iou(a, b):
+    # (len(a), len(b)) IoU of xyxy boxes
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def box_centers(boxes):
+    return np.column_stack(((boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2))
+
+
+# IoU/centroid tracker for line counting on model.predict output. Seedlings
+# move along x at the ground speed, so instead of a Kalman filter every track
+# is moved by its own smoothed x velocity (or the shared one, for a track seen
+# once) before association. Pairs with enough IoU are matched first, then
+# pairs whose predicted centres are within max_distance box sizes, greedily
+# by score. IDs are never reused; tracks unmatched for max_age updates are
+# dropped. direction is -1 for right-to-left travel, 1 for left-to-right.
+class CentroidTracker:
+    def __init__(self, direction=-1, iou_threshold=0.2, max_distance=1.0, max_age=5, smoothing=0.5):
+        self.direction = direction
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.max_age = max_age
+        self.smoothing = smoothing
+        self.reset()
+
+    def reset(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.boxes = np.empty((0, 4))
+        self.velocity = np.empty(0)  # px per video frame along x, NaN until a track has moved
+        self.last_frame = np.empty(0, dtype=np.int64)
+        self.last_update = np.empty(0, dtype=np.int64)
+        self.speed = 0.0  # shared x velocity of all matched tracks
+        self.updates = 0
+        self.next_id = 1
+
+    def predict(self, frame_count):
+        dt = frame_count - self.last_frame
+        velocity = np.where(np.isnan(self.velocity), self.speed, self.velocity)
+        shift = velocity * dt
+        return self.boxes + shift[:, None] * np.array([1.0, 0.0, 1.0, 0.0])
+
+    def match(self, predicted, boxes):
+        # (track index, detection index) pairs
+        iou = box_iou(predicted, boxes)
+        offset = box_centers(boxes)[None, :, :] - box_centers(predicted)[:, None, :]
+        # boxes entering or leaving the frame are cut along x, so size comes from the larger side
+        size = np.maximum(np.maximum(predicted[:, 2] - predicted[:, 0], predicted[:, 3] - predicted[:, 1]), 1.0)
+        distance = np.hypot(offset[..., 0], offset[..., 1]) / size[:, None]
+        # an IoU match always beats a centroid-only match
+        score = np.where(iou >= self.iou_threshold, 1.0 + iou,
+                         np.where(distance <= self.max_distance, 1.0 - distance / self.max_distance, -1.0))
+        candidates = np.argwhere(score >= 0)
+        order = np.argsort(-score[candidates[:, 0], candidates[:, 1]], kind="stable")
+        used_tracks = np.zeros(len(predicted), dtype=bool)
+        used_boxes = np.zeros(len(boxes), dtype=bool)
+        matches = []
+        for t, d in candidates[order]:
+            if used_tracks[t] or used_boxes[d]:
+                continue
+            used_tracks[t] = used_boxes[d] = True
+            matches.append((t, d))
+        return np.array(matches, dtype=np.int64).reshape(-1, 2)
+
+    def update(self, boxes, frame_count=None):
+        # track id per box, in the order given; frame_count is the video frame index
+        # (sampled frames may skip some), defaulting to one per update
+        self.updates += 1
+        if frame_count is None:
+            frame_count = self.updates
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        track_ids = np.full(len(boxes), -1, dtype=np.int64)
+
+        matches = np.empty((0, 2), dtype=np.int64)
+        if len(self.ids) and len(boxes):
+            matches = self.match(self.predict(frame_count), boxes)
+        if len(matches):
+            t, d = matches[:, 0], matches[:, 1]
+            dt = np.maximum(frame_count - self.last_frame[t], 1)
+            # a box cut by the frame edge keeps one edge pinned, so the edge that moved
+            # further along the travel direction gives the ground speed
+            edges = (boxes[d][:, [0, 2]] - self.boxes[t][:, [0, 2]]) * self.direction
+            moved = edges.max(axis=1) * self.direction / dt
+            previous = self.velocity[t]
+            self.velocity[t] = np.where(np.isnan(previous), moved,
+                                        self.smoothing * previous + (1 - self.smoothing) * moved)
+            self.speed = self.smoothing * self.speed + (1 - self.smoothing) * float(np.median(moved))
+            self.boxes[t] = boxes[d]
+            self.last_frame[t] = frame_count
+            self.last_update[t] = self.updates
+            track_ids[d] = self.ids[t]
+
+        new = np.flatnonzero(track_ids == -1)
+        if len(new):
+            new_ids = np.arange(self.next_id, self.next_id + len(new))
+            self.next_id += len(new)
+            track_ids[new] = new_ids
+            self.ids = np.concatenate((self.ids, new_ids))
+            self.boxes = np.concatenate((self.boxes, boxes[new]))
+            self.velocity = np.concatenate((self.velocity, np.full(len(new), np.nan)))
+            self.last_frame = np.concatenate((self.last_frame, np.full(len(new), frame_count)))
+            self.last_update = np.concatenate((self.last_update, np.full(len(new), self.updates)))
+
+        alive = self.updates - self.last_update <= self.max_age
+        if not alive.all():
+            self.ids = self.ids[alive]
+            self.boxes = self.boxes[alive]
+            self.velocity = self.velocity[alive]
+            self.last_frame = self.last_frame[alive]
+            self.last_update = self.last_update[alive]
+        return track_ids
@@ -0,0 +1,507 @@
+import asyncio
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+import numpy as np
+from seedling_table import SeedlingTable
+
+# Wire format: every frame is a little-endian uint32 payload length followed by
+# the payload, so the client can read whole frames off the stream. A payload is
+# a message type, a record count and that many fixed-size records.
+GPS_UPDATE = 1
+HEADER = struct.Struct("<IBH")  # payload length (after this field), message type, record count
+UPDATE = struct.Struct("<ddB")  # latitude, longitude, state code
+STATES = ("Normal_Transplant", "Root_Exposure", "Buried_Seedling", "Overlap", "Missing")
+UNKNOWN_STATE = 255
+DROP_POLICIES = ("merge", "oldest", "newest")
+
+# Twin state sync: a zlib-compressed SNAPSHOT of every seedling and missed point
+# when a client connects (or asks with RESYNC), then DELTA frames carrying only
+# the seedlings whose status changed and the new missed points. Both start with
+# the sequence range they cover; a client applies a delta only if its from-seq
+# matches the state it holds. Status codes follow STATES, 255 for unclassified.
+SNAPSHOT = 2
+DELTA = 3
+RESYNC = 4
+TWIN = struct.Struct("<QQII")  # from seq, to seq, seedling count, missed point count
+SEEDLING_DTYPE = np.dtype([("row", "<u4"), ("lat", "<f8"), ("lon", "<f8"), ("status", "u1")])
+MISSED_DTYPE = np.dtype([("id", "<u4"), ("lat", "<f8"), ("lon", "<f8")])
+
+
+def state_code(state):
+    return STATES.index(state) if state in STATES else UNKNOWN_STATE
+
+
+def state_name(code):
+    return STATES[code] if code < len(STATES) else str(code)
+
+
+def encode_frame(message_type, records, record_struct=UPDATE):
+    body = b"".join(record_struct.pack(*record) for record in records)
+    return HEADER.pack(HEADER.size - 4 + len(body), message_type, len(records)) + body
+
+
+def encode_twin(message_type, from_seq, to_seq, seedlings, missed):
+    body = seedlings.tobytes() + missed.tobytes()
+    if message_type == SNAPSHOT:
+        body = zlib.compress(body)
+    payload = TWIN.pack(from_seq, to_seq, len(seedlings), len(missed)) + body
+    return HEADER.pack(HEADER.size - 4 + len(payload), message_type, 0) + payload
+
+
+def decode_twin(message_type, payload):
+    from_seq, to_seq, seedling_count, missed_count = TWIN.unpack_from(payload)
+    body = payload[TWIN.size:]
+    if message_type == SNAPSHOT:
+        body = zlib.decompress(body)
+    seedlings = np.frombuffer(body, SEEDLING_DTYPE, seedling_count)
+    missed = np.frombuffer(body, MISSED_DTYPE, missed_count, seedling_count * SEEDLING_DTYPE.itemsize)
+    return from_seq, to_seq, seedlings, missed
+
+
+class FrameDecoder:
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        # returns the complete frames in data as (message type, payload after the header)
+        self.buffer += data
+        frames = []
+        while len(self.buffer) >= HEADER.size:
+            length, message_type, count = HEADER.unpack_from(self.buffer)
+            if len(self.buffer) < 4 + length:
+                break
+            frames.append((message_type, count, bytes(self.buffer[HEADER.size:4 + length])))
+            del self.buffer[:4 + length]
+        return frames
+
+
+def decode_updates(count, payload):
+    return [(lat, lon, state_name(code)) for lat, lon, code in
+            (UPDATE.unpack_from(payload, i * UPDATE.size) for i in range(count))]
+
+
+# Twin update server for the Unity client. Producers call send_gps_data from any
+# thread and never block: updates go into a bounded buffer that an asyncio loop
+# on its own thread drains in batches. When the client is slow or absent the
+# buffer applies the drop policy: "merge" replaces a pending update for the same
+# position (and drops the oldest when full), "oldest" drops the oldest, "newest"
+# drops the incoming update.
+class UnityCommManager:
+    def __init__(self, host='127.0.0.1', port=8888, queue_size=4096, drop_policy='merge',
+                 batch_size=256, flush_interval=0.02, retry_interval=1.0):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"drop_policy must be one of {DROP_POLICIES}")
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+
+        self.lock = threading.Lock()
+        self.pending = OrderedDict()
+        self.next_key = 0
+        self.wake_pending = False
+        self.loop = None
+        self.thread = None
+        self.server = None
+        self.writer = None
+        self.ready = threading.Event()
+
+        self.requested = 0
+        self.sent = 0
+        self.batches = 0
+        self.merged = 0
+        self.dropped = 0
+
+        # versioned twin state, fed by the status dashboard's classifier
+        self.twin = SeedlingTable()
+        self.twin_missed = []
+        self.twin_seq = 0
+        self.client_seq = None  # state the connected client holds; None means it needs a snapshot
+        self.dirty_rows = set()
+        self.sent_missed = 0
+        self.snapshots = 0
+        self.deltas = 0
+
+    def start_server(self):
+        # returns at once; binding and accepting happen on the loop thread
+        if self.thread is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.wakeup = asyncio.Event()
+        self.stopping = asyncio.Event()
+        self.ready.set()
+        try:
+            self.loop.run_until_complete(self._serve())
+        finally:
+            self.loop.close()
+
+    async def _serve(self):
+        sender = asyncio.ensure_future(self._send_loop())
+        # a port still held by a previous run is retried instead of failing the caller
+        reported = False
+        while not self.stopping.is_set():
+            try:
+                self.server = await asyncio.start_server(self._on_client, self.host, self.port)
+                print(f"Unity server listening on {self.host}:{self.port}")
+                break
+            except OSError as e:
+                if not reported:
+                    print(f"Unity server cannot bind {self.host}:{self.port} ({e}), retrying")
+                    reported = True
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), self.retry_interval)
+                except asyncio.TimeoutError:
+                    pass
+        await self.stopping.wait()
+
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        sender.cancel()
+        try:
+            await sender
+        except asyncio.CancelledError:
+            pass
+
+    async def _on_client(self, reader, writer):
+        # the newest connection wins, so a restarted Unity client takes over at once
+        if self.writer is not None:
+            self.writer.close()
+        with self.lock:
+            self.client_seq = None
+        self.writer = writer
+        print(f"Unity client connected: {writer.get_extra_info('peername')}")
+        self.wakeup.set()
+        decoder = FrameDecoder()
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                for message_type, _, _ in decoder.feed(data):
+                    if message_type == RESYNC:
+                        with self.lock:
+                            self.client_seq = None
+                        self.wakeup.set()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            if self.writer is writer:
+                self.writer = None
+                print("Unity client disconnected")
+            writer.close()
+
+    def _twin_records(self, rows):
+        records = np.empty(len(rows), dtype=SEEDLING_DTYPE)
+        records["row"] = rows
+        records["lat"] = self.twin.lat[rows]
+        records["lon"] = self.twin.lon[rows]
+        records["status"] = self.twin.status[rows].astype(np.uint8)
+        return records
+
+    def _missed_records(self, start):
+        missed = np.empty(len(self.twin_missed) - start, dtype=MISSED_DTYPE)
+        missed["id"] = np.arange(start, len(self.twin_missed))
+        if len(missed):
+            missed["lat"], missed["lon"] = np.array(self.twin_missed[start:]).T
+        return missed
+
+    def _take_twin(self):
+        # called with self.lock held; twin frames go before queued GPS updates
+        if self.client_seq is None:
+            frame = encode_twin(SNAPSHOT, 0, self.twin_seq,
+                                self._twin_records(np.arange(len(self.twin))), self._missed_records(0))
+            self.snapshots += 1
+        elif self.client_seq != self.twin_seq:
+            rows = np.fromiter(sorted(self.dirty_rows), dtype=np.int64, count=len(self.dirty_rows))
+            frame = encode_twin(DELTA, self.client_seq, self.twin_seq,
+                                self._twin_records(rows), self._missed_records(self.sent_missed))
+            self.deltas += 1
+        else:
+            return None
+        self.client_seq = self.twin_seq
+        self.dirty_rows.clear()
+        self.sent_missed = len(self.twin_missed)
+        return frame
+
+    def _take_next(self):
+        # one twin frame or one batch of GPS updates, whichever is due
+        with self.lock:
+            twin = self._take_twin()
+            batch = []
+            if twin is None:
+                while self.pending and len(batch) < self.batch_size:
+                    batch.append(self.pending.popitem(last=False))
+            if twin is None and not self.pending:
+                self.wake_pending = False
+            return twin, batch
+
+    def _requeue(self, batch):
+        # put an unsent batch back in front, still subject to the size bound
+        with self.lock:
+            for key, update in reversed(batch):
+                if key not in self.pending:
+                    self.pending[key] = update
+                    self.pending.move_to_end(key, last=False)
+            while len(self.pending) > self.queue_size:
+                self.pending.popitem(last=False)
+                self.dropped += 1
+
+    async def _send_loop(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            # give a burst a moment to collect into one frame
+            await asyncio.sleep(self.flush_interval)
+            while self.writer is not None:
+                writer = self.writer
+                twin, batch = self._take_next()
+                if twin is None and not batch:
+                    break
+                try:
+                    writer.write(twin if twin is not None else
+                                 encode_frame(GPS_UPDATE, [update for _, update in batch]))
+                    await writer.drain()
+                    if batch:
+                        self.sent += len(batch)
+                        self.batches += 1
+                except (ConnectionError, OSError):
+                    self._requeue(batch)
+                    if self.writer is writer:
+                        self.writer = None
+                    break
+
+    def send_gps_data(self, lat, lon, state):
+        # non-blocking; returns False when the update was dropped
+        update = (float(lat), float(lon), state_code(state))
+        with self.lock:
+            self.requested += 1
+            if self.drop_policy == 'merge':
+                key = update[:2]
+                if key in self.pending:
+                    self.pending[key] = update
+                    self.merged += 1
+                    return True
+            else:
+                key = self.next_key
+                self.next_key += 1
+            if len(self.pending) >= self.queue_size:
+                if self.drop_policy == 'newest':
+                    self.dropped += 1
+                    return False
+                self.pending.popitem(last=False)
+                self.dropped += 1
+            self.pending[key] = update
+            notify = not self.wake_pending
+            self.wake_pending = True
+        if notify:
+            self._notify()
+        return True
+
+    def _notify(self):
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def update_twin(self, table, rows, missed_points):
+        # rows and missed_points are a StreamingClassifier change set; table is its SeedlingTable
+        with self.lock:
+            start = len(self.twin)
+            if len(table) > start:
+                self.twin.extend(table.frame[start:], table.lat[start:], table.lon[start:], table.label[start:])
+            rows = np.fromiter(rows, dtype=np.int64)
+            self.twin.status[rows] = table.status[rows]
+            self.twin_missed.extend((p["lat"], p["lon"]) for p in missed_points)
+            self.twin_seq += 1
+            if self.client_seq is not None:
+                self.dirty_rows.update(rows.tolist())
+                if len(self.dirty_rows) > self.queue_size:
+                    # a client this far behind is better served by a fresh snapshot
+                    self.client_seq = None
+                    self.dirty_rows.clear()
+            notify = not self.wake_pending
+            self.wake_pending = True
+        if notify:
+            self._notify()
+
+    def reset_twin(self):
+        with self.lock:
+            self.twin.clear()
+            self.twin_missed = []
+            self.twin_seq += 1
+            self.client_seq = None
+            self.dirty_rows.clear()
+            self.sent_missed = 0
+            notify = not self.wake_pending
+            self.wake_pending = True
+        if notify:
+            self._notify()
+
+    def is_connected(self):
+        return self.writer is not None
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requested": self.requested,
+                "sent": self.sent,
+                "batches": self.batches,
+                "merged": self.merged,
+                "dropped": self.dropped,
+                "pending": len(self.pending),
+                "twin_seq": self.twin_seq,
+                "snapshots": self.snapshots,
+                "deltas": self.deltas
+            }
+
+    def stop_server(self, timeout=2.0):
+        if self.thread is None:
+            return
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.stopping.set)
+        self.thread.join(timeout)
+        self.thread = None
+        print(f"Unity server stopped: {self.stats()}")
+
+
+# Headless stand-in for the Unity client, for tests and bench runs without the
+# renderer. It reconnects on its own and can be slowed down with `delay` to
+# exercise the server's drop policy.
+class UnityStandIn:
+    def __init__(self, host='127.0.0.1', port=8888, delay=0.0, retry_interval=0.2, verbose=False):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.retry_interval = retry_interval
+        self.verbose = verbose
+        self.updates = []
+        self.frames = 0
+        # twin state as the renderer would hold it
+        self.seq = None
+        self.seedlings = {}
+        self.missed = {}
+        self.snapshots = 0
+        self.deltas = 0
+        self.resyncs = 0
+        self.writer = None
+        self.connected = threading.Event()
+        self.running = False
+        self.thread = None
+        self.loop = None
+
+    def start(self):
+        self.running = True
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._main, daemon=True)
+        self.thread.start()
+        return self
+
+    def _main(self):
+        self.task = self.loop.create_task(self._run())
+        try:
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.loop.close()
+
+    async def _run(self):
+        while self.running:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError:
+                await asyncio.sleep(self.retry_interval)
+                continue
+            self.writer = writer
+            self.seq = None
+            self.connected.set()
+            decoder = FrameDecoder()
+            try:
+                while self.running:
+                    data = await reader.read(65536)
+                    if not data:
+                        break
+                    for message_type, count, payload in decoder.feed(data):
+                        self.handle(message_type, count, payload)
+                        if self.delay:
+                            await asyncio.sleep(self.delay)
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                self.connected.clear()
+                writer.close()
+
+    def handle(self, message_type, count, payload):
+        self.frames += 1
+        if message_type == GPS_UPDATE:
+            updates = decode_updates(count, payload)
+            self.updates.extend(updates)
+            if self.verbose:
+                for lat, lon, state in updates:
+                    print(f"{state}: ({lat}, {lon})")
+        elif message_type in (SNAPSHOT, DELTA):
+            from_seq, to_seq, seedlings, missed = decode_twin(message_type, payload)
+            if message_type == SNAPSHOT:
+                self.seedlings = {}
+                self.missed = {}
+                self.snapshots += 1
+            elif from_seq != self.seq:
+                # missed a delta: ask for a snapshot instead of drifting
+                self.resyncs += 1
+                self.writer.write(HEADER.pack(HEADER.size - 4, RESYNC, 0))
+                return
+            else:
+                self.deltas += 1
+            for row, lat, lon, status in seedlings.tolist():
+                self.seedlings[row] = (lat, lon, state_name(status))
+            for point_id, lat, lon in missed.tolist():
+                self.missed[point_id] = (lat, lon)
+            self.seq = to_seq
+            if self.verbose:
+                print(f"twin seq {to_seq}: {len(seedlings)} seedlings, {len(missed)} missed points"
+                      f" ({'snapshot' if message_type == SNAPSHOT else 'delta'})")
+
+    def wait_for(self, count, timeout=5.0):
+        deadline = time.time() + timeout
+        while len(self.updates) < count and time.time() < deadline:
+            time.sleep(0.01)
+        return len(self.updates) >= count
+
+    def stop(self):
+        self.running = False
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.task.cancel)
+        if self.thread is not None:
+            self.thread.join(1.0)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="headless Unity stand-in: connect and print twin updates")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds spent per frame, to mimic a slow renderer")
+    args = parser.parse_args()
+
+    stand_in = UnityStandIn(args.host, args.port, args.delay, verbose=True).start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stand_in.stop()
+        print(f"received {len(stand_in.updates)} updates in {stand_in.frames} frames")
@@ -0,0 +1,79 @@
+import threading
+from collections import deque
+import cv2
+
+DROP_POLICIES = ("oldest", "newest", "block")
+
+
+def open_video_writer(output_path, fps, size):
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    writer = cv2.VideoWriter(output_path, fourcc, fps, size)
+    if not writer.isOpened():
+        print("WARNING: mp4v encoding failed, trying XVID encoding...")
+        fourcc = cv2.VideoWriter_fourcc(*'XVID')
+        output_path = output_path.replace('.mp4', '.avi')
+        writer = cv2.VideoWriter(output_path, fourcc, fps, size)
+    if not writer.isOpened():
+        raise RuntimeError("Check the encoding or path!")
+    return writer, output_path
+
+
+class AsyncVideoWriter:
+    def __init__(self, output_path, fps, frame_size, output_size=None, buffer_size=32, drop_policy="oldest"):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"unknown drop policy {drop_policy}")
+        self.output_size = output_size if output_size and output_size != frame_size else None
+        self.writer, self.output_path = open_video_writer(output_path, fps, output_size or frame_size)
+        self.buffer_size = buffer_size
+        self.drop_policy = drop_policy
+        self.frames = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.written = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self, frame):
+        with self.condition:
+            if self.closed:
+                return False
+            if len(self.frames) >= self.buffer_size:
+                if self.drop_policy == "newest":
+                    self.dropped += 1
+                    return False
+                if self.drop_policy == "oldest":
+                    self.frames.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self.frames) >= self.buffer_size and not self.closed:
+                        self.condition.wait()
+                    if self.closed:
+                        return False
+            self.frames.append(frame)
+            self.condition.notify_all()
+            return True
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.frames and not self.closed:
+                    self.condition.wait()
+                if not self.frames:
+                    break
+                frame = self.frames.popleft()
+                self.condition.notify_all()
+            # resize and encode happen here, off the detection thread
+            if self.output_size is not None:
+                frame = cv2.resize(frame, self.output_size)
+            self.writer.write(frame)
+            self.written += 1
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
+        self.writer.release()
+        if self.dropped:
+            print(f"WARNING: video writer dropped {self.dropped} frames ({self.written} written)")